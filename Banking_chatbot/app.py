@@ -1,27 +1,135 @@
+import atexit
 import json
-from flask import Flask, render_template, request, redirect, url_for
+import os
+import threading
+from contextlib import contextmanager
+from flask import Flask, render_template, request, redirect, url_for, session
 from openai import OpenAI
-import requests
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 
 client = OpenAI(api_key="your_api_key")
 
 app = Flask(__name__)
+# Who is logged in lives in each browser's signed session cookie, so any
+# worker can serve any request
+app.secret_key = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+
+DB_FILE = 'db.json'
+LOCK_FILE = 'db.json.lock'
+
+# Seconds to wait after a change before writing db.json, so bursts of
+# transfers cost one write
+FLUSH_DELAY = 1.0
+
+# Set SHARED_DB=1 when several worker processes serve the same db.json.
+# Every operation then holds a file lock, reloads changes made by other
+# workers and writes transfers through immediately instead of debouncing.
+SHARED_DB = os.environ.get('SHARED_DB') == '1' and fcntl is not None
+
+db = []
+db_signature = None
+db_lock = threading.RLock()
+
+# Both indexes point at the same dicts as db, so updates show up in all three
+accounts_by_no = {}
+accounts_by_name = {}
+
+def reindex():
+    accounts_by_no.clear()
+    accounts_by_name.clear()
+    for users in db:
+        accounts_by_no[users['acc_no']] = users
+        accounts_by_name.setdefault(users['name'], users)
+
+def file_signature():
+    stat = os.stat(DB_FILE)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def load():
+    global db_signature
+    with open(DB_FILE) as json_file:
+        db[:] = json.load(json_file)
+    db_signature = file_signature()
+    reindex()
+
+load()
+
+@contextmanager
+def locked_db(write=False):
+    """Hold the db for one request, across threads and, if shared, processes"""
+    with db_lock:
+        if not SHARED_DB:
+            yield
+            return
+        with open(LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+            try:
+                if file_signature() != db_signature:
+                    load()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
-auth_array = ["", False]
+def session_name():
+    return session.get('name', '')
 
-with open('db.json') as json_file:
-	db = json.load(json_file)
+def session_authorised():
+    return session.get('authorised', False)
+
+def account_details(users):
+    if users is None:
+        return {"name": ""}
+    return {"name": users['name'], "balance": users['balance'], "acc_no": users['acc_no']}
+
+flush_lock = threading.Lock()
+flush_timer = None
+
+def write_db():
+    global db_signature
+    with db_lock:
+        data = json.dumps(db, indent=2)
+    with open(DB_FILE + '.tmp', 'w') as json_file:
+        json_file.write(data)
+    os.replace(DB_FILE + '.tmp', DB_FILE)
+    db_signature = file_signature()
+
+def flush():
+    global flush_timer
+    with flush_lock:
+        flush_timer = None
+        write_db()
 
 def commit():
-    with open('db.json', 'w') as json_file:
-        json.dump(db, json_file, indent=2)
+    """Schedule a background write of db.json, coalescing rapid changes"""
+    global flush_timer
+    if SHARED_DB:
+        # Called under the exclusive file lock; other workers must see it now
+        write_db()
+        return
+    with flush_lock:
+        if flush_timer is None:
+            flush_timer = threading.Timer(FLUSH_DELAY, flush)
+            flush_timer.daemon = True
+            flush_timer.start()
+
+@atexit.register
+def flush_pending():
+    with flush_lock:
+        timer = flush_timer
+    if timer is not None:
+        timer.cancel()
+        flush()
 
 
 
 @app.route('/')
 def home():
-    return render_template('index.html', prediction=None, authorised=auth_array[1],name=auth_array[0], data=None)
+    return render_template('index.html', prediction=None, authorised=session_authorised(),name=session_name(), data=None)
 
 @app.route('/classify', methods=['POST'])
 def classify():
@@ -33,7 +141,7 @@ def classify():
             {"role": "system", "content": '''You are a banking chatbot. Give first line as intent of question: CHITCHAT, GET_BALANCE, TRANSFER_MONEY .     
             Second line will be response, if intent was TRANSFER_MONEY give ouptut ACNO:(Account Number in prompt), AMT:(Amount in prompt). If intent was
             CHITCHAT reply accordingly. If intent was GET_BALANCE give output ACNO:(Account Number in prompt)'''},
-            {"role": "user", "content": text + ".My name is " + auth_array[0]}
+            {"role": "user", "content": text + ".My name is " + session_name()}
         ]
         )
 
@@ -42,78 +150,74 @@ def classify():
         intent = gpt_response.split("\n")[0]
         intent = intent.strip()
         if intent == "CHITCHAT":
-            return  render_template('index.html', text=text, prediction=intent,authorised=auth_array[1],name=auth_array[0], data=gpt_response.split("\n")[1])
+            return  render_template('index.html', text=text, prediction=intent,authorised=session_authorised(),name=session_name(), data=gpt_response.split("\n")[1])
         elif intent == "TRANSFER_MONEY":
             to_acc, amt = gpt_response.split("\n")[1].split(',')
             to_acc = to_acc.split(':')[1]
             amt = amt.split(':')[1]
-            return render_template('transfer.html',name=auth_array[0], data=to_acc, amt=amt)
+            return render_template('transfer.html',name=session_name(), data=to_acc, amt=amt)
         elif intent == "GET_BALANCE":
             acc = gpt_response.split("\n")[1].split(":")[1].strip()
-            response = requests.get("http://localhost:5000/get_details/"+acc)
-            if response.status_code == 200:
-                det = response.json()
-                if det["name"] != "":
-                    return render_template('index.html', text=text, prediction=intent,authorised=auth_array[1],name=auth_array[0], data="Name is " + det["name"] + " .Balance is "+ det['balance'])
-                else:
-                    return render_template('index.html', text=text, prediction=intent,authorised=auth_array[1],name=auth_array[0], data="No such user found")
+            with locked_db():
+                det = account_details(accounts_by_no.get(acc))
+            if det["name"] != "":
+                return render_template('index.html', text=text, prediction=intent,authorised=session_authorised(),name=session_name(), data="Name is " + det["name"] + " .Balance is "+ det['balance'])
+            else:
+                return render_template('index.html', text=text, prediction=intent,authorised=session_authorised(),name=session_name(), data="No such user found")
         else:
-            return render_template('index.html', text=text, prediction=None, authorised=auth_array[1],name=auth_array[0],data=gpt_response)
+            return render_template('index.html', text=text, prediction=None, authorised=session_authorised(),name=session_name(),data=gpt_response)
 
 @app.route('/get_user', methods=['POST'])
 def get_user():
     name = request.form['name']
     accno = request.form['accno']
     auth = request.form['auth']
-    for users in db:
-        if users['name'] == name and users["acc_no"] == accno:
-            if users["auth_code"] == auth:
-                auth_array[0] = name
-                auth_array[1] = True
-                return render_template('index.html', prediction=None, authorised=auth_array[1],name=auth_array[0], data="Auth Successful")
-            else:
-                return render_template('index.html', prediction=None, authorised=auth_array[1],name=auth_array[0], data="Auth Failed")
+    with locked_db():
+        users = accounts_by_no.get(accno)
+    if users is not None and users['name'] == name:
+        if users["auth_code"] == auth:
+            session['name'] = name
+            session['authorised'] = True
+            return render_template('index.html', prediction=None, authorised=session_authorised(),name=session_name(), data="Auth Successful")
+        else:
+            return render_template('index.html', prediction=None, authorised=session_authorised(),name=session_name(), data="Auth Failed")
     
-    return render_template('index.html', prediction=None, authorised=auth_array[1],name=auth_array[0], data="Auth Failed")
+    return render_template('index.html', prediction=None, authorised=session_authorised(),name=session_name(), data="Auth Failed")
      
 @app.route('/transfer_money', methods=['POST'])
 def transfer_money():
-    if auth_array[1] == True:
+    if session_authorised() == True:
         name = request.form['name']
         accno = request.form['data']
         amt = request.form['amt']
         print(name, accno, amt)
-        response = requests.get("http://localhost:5000/user_search/"+name)
-        
-        if response.status_code == 200:
-            det = response.json()
-            if det['name'] != "" and int(det['balance']) >= int(amt):
-                for users in db:
-                    if users['name'] == name:
-                        users['balance'] = str(int(users['balance']) - int(amt))
-                        for user2 in db:
-                            if user2['acc_no'] == accno:
-                                user2['balance'] = str(int(user2['balance']) + int(amt))
-                                commit()     
-                                return render_template('index.html', prediction=None, authorised=auth_array[1],name=auth_array[0], data="Transfer Successful")      
-        return render_template('index.html', prediction=None, authorised=auth_array[1],name=auth_array[0], data="Transfer Failed")
+        with locked_db(write=True):
+            # Only the logged-in user's own account can be debited
+            sender = accounts_by_name.get(name) if name == session_name() else None
+            receiver = accounts_by_no.get(accno.strip())
+            
+            # Both ends are checked before either balance changes
+            transferred = sender is not None and receiver is not None and int(sender['balance']) >= int(amt)
+            if transferred:
+                sender['balance'] = str(int(sender['balance']) - int(amt))
+                receiver['balance'] = str(int(receiver['balance']) + int(amt))
+                commit()
+        if transferred:
+            return render_template('index.html', prediction=None, authorised=session_authorised(),name=session_name(), data="Transfer Successful")      
+        return render_template('index.html', prediction=None, authorised=session_authorised(),name=session_name(), data="Transfer Failed")
     else:
-        return render_template('index.html', prediction=None, authorised=auth_array[1],name=auth_array[0], data="Not Authorised")
+        return render_template('index.html', prediction=None, authorised=session_authorised(),name=session_name(), data="Not Authorised")
 
 
 @app.route('/user_search/<name>', methods=['get'])
 def user_name(name):
-    for users in db:
-        if users['name'] == name:
-            return {"name": users['name'], "balance": users['balance'], "acc_no": users['acc_no']}
-    return {"name": ""}
+    with locked_db():
+        return account_details(accounts_by_name.get(name))
             
 @app.route('/get_details/<acc>', methods=['get'])
 def get_details(acc):
-    for users in db:
-        if users['acc_no'] == acc:
-            return {"name": users['name'], "balance": users['balance'], "acc_no": users['acc_no']}
-    return {"name": ""}
+    with locked_db():
+        return account_details(accounts_by_no.get(acc))
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,133 @@
+# Compare classifier checkpoints on load time, memory, latency and held-out F1
+#
+#   python benchmark_classifier.py model_weights.pth model_compact.pth [--data Real] [--json out.json]
+#
+# Each checkpoint is measured in its own process so load time and RSS aren't
+# skewed by whatever was loaded before it. F1 is on the 20% test split of
+# the dataset, drawn the way cnn.ipynb drew it (random_split, seed 42).
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from torchvision.datasets import ImageFolder
+from torch.utils import data
+from sklearn.metrics import f1_score
+from models import load_classifier
+
+
+def rss_mb():
+    """Current resident set size; peak RSS where /proc is unavailable"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def test_split(root, input_size):
+    dataset = ImageFolder(root=root)
+    gen = torch.Generator().manual_seed(42)
+    _, test_dataset = data.random_split(dataset, [0.8, 0.2], generator=gen)
+    transform = transforms.Compose([
+        transforms.Resize((input_size, input_size)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    ])
+    return [(transform(x), y) for x, y in test_dataset]
+
+
+def latency_ms(model, input_size, batch_size, runs):
+    batch = torch.rand(batch_size, 3, input_size, input_size)
+    for _ in range(3):
+        model(batch)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(batch)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), float(np.percentile(times, 95))
+
+
+def measure(args):
+    baseline = rss_mb()
+    start = time.perf_counter()
+    model = load_classifier(args.measure)
+    load_s = time.perf_counter() - start
+    loaded = rss_mb()
+
+    size = model.input_size
+    result = {
+        "checkpoint": args.measure,
+        "file_mb": os.path.getsize(args.measure) / 1e6,
+        "input_size": size,
+        "load_s": load_s,
+        "rss_mb": loaded - baseline,
+    }
+    with torch.no_grad():
+        result["p50_ms_1"], result["p95_ms_1"] = latency_ms(model, size, 1, args.runs)
+        result["p50_ms_batch"], result["p95_ms_batch"] = latency_ms(model, size, args.batch_size, args.runs)
+
+        if args.data:
+            y_true, y_pred = [], []
+            for X, y in data.DataLoader(test_split(args.data, size), batch_size=args.batch_size):
+                y_true.extend(y.tolist())
+                y_pred.extend(model(X).argmax(1).tolist())
+            result["f1"] = f1_score(y_true, y_pred, average="macro")
+            result["accuracy"] = float(np.mean(np.array(y_true) == np.array(y_pred)))
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark violence classifier checkpoints")
+    parser.add_argument("checkpoints", nargs="*", default=["model_weights.pth", "model_compact.pth"])
+    parser.add_argument("--data", default="Real", help="ImageFolder root the model was trained on; '' to skip F1")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=50, help="timed forward passes per batch size")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads (default: torch's choice)")
+    parser.add_argument("--json", dest="json_path", help="also write results to this file")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    if args.measure:
+        measure(args)
+        return
+
+    if args.data and not os.path.isdir(args.data):
+        print(f"{args.data}/ not found, skipping F1")
+        args.data = ""
+    rows = []
+    for checkpoint in args.checkpoints:
+        command = [sys.executable, __file__, "--measure", checkpoint, "--data", args.data,
+                   "--batch-size", str(args.batch_size), "--runs", str(args.runs)]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        rows.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'checkpoint':<24} {'size':>5} {'file MB':>8} {'load s':>7} {'RSS MB':>7} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {f'x{args.batch_size} ms':>8} {'F1':>6}")
+    for row in rows:
+        f1 = f"{row['f1']:.3f}" if "f1" in row else "-"
+        print(f"{os.path.basename(row['checkpoint']):<24} {row['input_size']:>5} {row['file_mb']:>8.1f} "
+              f"{row['load_s']:>7.2f} {row['rss_mb']:>7.0f} {row['p50_ms_1']:>7.2f} {row['p95_ms_1']:>7.2f} "
+              f"{row['p50_ms_batch']:>8.2f} {f1:>6}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# Export the violence classifier as a compact checkpoint for the Pi
+import argparse
+import os
+import torch
+from models import fold_input, load_classifier, quantize, save_compact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shrink the fp32 violence classifier for CPU inference")
+    parser.add_argument("--weights", default="model_weights.pth", help="trained fp32 state dict")
+    parser.add_argument("--out", default="model_compact.pth")
+    parser.add_argument("--input-size", type=int, default=224,
+                        help="crop size the compact model takes; must divide 224 (e.g. 112, 56)")
+    parser.add_argument("--no-quantize", action="store_true", help="keep fp32 weights, only shrink the input")
+    args = parser.parse_args()
+
+    model = fold_input(load_classifier(args.weights), args.input_size)
+    if not args.no_quantize:
+        model = quantize(model)
+    save_compact(model, args.out, quantized=not args.no_quantize)
+
+    before, after = os.path.getsize(args.weights), os.path.getsize(args.out)
+    print(f"{args.weights}: {before / 1e6:.1f} MB -> {args.out}: {after / 1e6:.1f} MB "
+          f"({args.input_size}x{args.input_size}, {'fp32' if args.no_quantize else 'int8'})")
+
+
+if __name__ == "__main__":
+    with torch.no_grad():
+        main()
@@ -0,0 +1,24 @@
+# Decoding of raw YOLO output rows, kept free of OpenCV and torch
+import numpy as np
+
+
+def decode_outputs(outputs, W, H, conf, class_ids):
+    """Turn raw YOLO rows into candidate boxes, all rows at once.
+
+    A row is kept when its best-scoring class is one of class_ids and that
+    score is above conf. Returns (boxes as [x, y, w, h] ints, confidences,
+    class ids), the lists cv.dnn.NMSBoxes and the drawing code expect.
+    """
+    scores = outputs[:, 5:]
+    # Only rows where a wanted class clears conf can pass, so the full
+    # argmax runs on those few rows instead of all ~10k
+    rows = np.flatnonzero((scores[:, class_ids] > conf).any(axis=1))
+    best = scores[rows].argmax(axis=1)
+    confidences = scores[rows, best]
+    keep = np.isin(best, class_ids) & (confidences > conf)
+    rows, best, confidences = rows[keep], best[keep], confidences[keep]
+
+    xywh = outputs[rows, :4] * np.array([W, H, W, H])
+    corners = xywh[:, :2] - np.floor_divide(xywh[:, 2:], 2)
+    boxes = np.hstack([corners, xywh[:, 2:]]).astype(int)
+    return boxes.tolist(), confidences.astype(float).tolist(), best.tolist()
@@ -1,17 +1,86 @@
+import torch
 from torch import nn
+from torch.ao.nn.quantized import dynamic as nnqd
 class NeuralNetwork(nn.Module):
-    def __init__(self):
+    def __init__(self, input_size=224, linear=nn.Linear):
         super().__init__()
+        self.input_size = input_size
         self.flatten = nn.Flatten()
         self.linear_relu_stack = nn.Sequential(
-            nn.Linear(3*224*224, 512),
+            linear(3*input_size*input_size, 512),
             nn.ReLU(),
-            nn.Linear(512, 512),
+            linear(512, 512),
             nn.ReLU(),
-            nn.Linear(512, 2)
+            linear(512, 2)
         )
 
     def forward(self, x):
         x = self.flatten(x)
         logits = self.linear_relu_stack(x)
-        return logits
\ No newline at end of file
+        return logits
+
+
+def fold_input(model, input_size):
+    """Copy of a trained model that takes input_size x input_size images.
+
+    The first layer's weights are summed over each block of pixels that a
+    nearest-neighbour upscale from input_size to model.input_size would
+    fill, so the small model gives the large one's logits for such an
+    upscaled image. No retraining is needed; what is lost is the detail
+    a smaller crop can't hold.
+    """
+    size = model.input_size
+    if input_size == size:
+        return model
+    if size % input_size:
+        raise ValueError(f"input size must divide {size}, got {input_size}")
+    factor = size // input_size
+    state = model.state_dict()
+    weight = state['linear_relu_stack.0.weight']
+    state['linear_relu_stack.0.weight'] = (
+        weight.view(-1, 3, input_size, factor, input_size, factor).sum((3, 5)).flatten(1))
+    small = NeuralNetwork(input_size)
+    small.load_state_dict(state)
+    return small.eval()
+
+
+def _select_quantized_engine():
+    engines = torch.backends.quantized.supported_engines
+    # ARM builds (Raspberry Pi) only ship qnnpack
+    if 'fbgemm' not in engines and 'qnnpack' in engines:
+        torch.backends.quantized.engine = 'qnnpack'
+
+
+def quantize(model):
+    """Dynamic int8 quantization of the Linear layers, for CPU inference"""
+    _select_quantized_engine()
+    return torch.quantization.quantize_dynamic(model.eval(), {nn.Linear}, dtype=torch.qint8)
+
+
+def save_compact(model, path, quantized):
+    """Save the weights together with what load_classifier needs to rebuild the model"""
+    torch.save({
+        'input_size': model.input_size,
+        'quantized': quantized,
+        'state_dict': model.state_dict(),
+    }, path)
+
+
+def load_classifier(path, device="cpu"):
+    """Load either a plain fp32 state dict (model_weights.pth) or a save_compact checkpoint"""
+    checkpoint = torch.load(path, map_location="cpu")
+    if 'state_dict' not in checkpoint:
+        model = NeuralNetwork()
+        model.load_state_dict(checkpoint)
+        return model.to(device).eval()
+
+    if checkpoint['quantized']:
+        # Built with int8 layers directly, never holding the fp32 weights.
+        # Quantized Linear layers only run on the CPU
+        _select_quantized_engine()
+        model = NeuralNetwork(checkpoint['input_size'], linear=nnqd.Linear)
+        device = "cpu"
+    else:
+        model = NeuralNetwork(checkpoint['input_size'])
+    model.load_state_dict(checkpoint['state_dict'])
+    return model.to(device).eval()
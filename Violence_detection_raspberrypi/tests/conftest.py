@@ -0,0 +1,10 @@
+import importlib.util
+import os
+import sys
+
+# Load detections.py by path rather than putting this directory on sys.path,
+# where its models.py would shadow the banking app's models package
+_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'detections.py')
+_spec = importlib.util.spec_from_file_location('detections', _path)
+sys.modules['detections'] = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sys.modules['detections'])
@@ -0,0 +1,47 @@
+import numpy as np
+from detections import decode_outputs
+
+# Two wanted classes out of five, standing in for person and knife
+CLASS_IDS = np.array([0, 3])
+
+def row(box, scores):
+    return [*box, 1.0, *scores]
+
+def decode(rows, conf=0.5, W=100, H=200):
+    return decode_outputs(np.array(rows, dtype=np.float64), W, H, conf, CLASS_IDS)
+
+def test_keeps_confident_whitelisted_rows():
+    boxes, confidences, class_ids = decode([
+        row((0.5, 0.5, 0.2, 0.1), (0.1, 0.0, 0.0, 0.8, 0.0)),
+        row((0.5, 0.5, 0.2, 0.1), (0.9, 0.0, 0.0, 0.0, 0.0)),
+    ])
+    assert class_ids == [3, 0]
+    assert confidences == [0.8, 0.9]
+    assert len(boxes) == 2
+
+def test_rejects_low_confidence_rows():
+    boxes, confidences, class_ids = decode([
+        row((0.5, 0.5, 0.2, 0.1), (0.4, 0.0, 0.0, 0.0, 0.0)),
+        row((0.5, 0.5, 0.2, 0.1), (0.5, 0.0, 0.0, 0.0, 0.0)),
+    ])
+    assert (boxes, confidences, class_ids) == ([], [], [])
+
+def test_best_class_must_be_whitelisted():
+    # A wanted class clears conf here, but another class scores higher
+    boxes, confidences, class_ids = decode([
+        row((0.5, 0.5, 0.2, 0.1), (0.0, 0.9, 0.0, 0.6, 0.0)),
+        row((0.5, 0.5, 0.2, 0.1), (0.6, 0.0, 0.0, 0.0, 0.7)),
+    ])
+    assert (boxes, confidences, class_ids) == ([], [], [])
+
+def test_boxes_truncate_like_the_per_row_decode():
+    box = (0.123, 0.456, 0.311, 0.2)
+    boxes, _, _ = decode([row(box, (0.9, 0.0, 0.0, 0.0, 0.0))])
+
+    x, y, w, h = np.array(box) * np.array([100, 200, 100, 200])
+    assert boxes == [[int(x - w // 2), int(y - h // 2), int(w), int(h)]]
+    # The left edge is off-frame and truncates toward zero
+    assert boxes == [[-2, 71, 31, 40]]
+
+def test_no_rows():
+    assert decode(np.empty((0, 10))) == ([], [], [])
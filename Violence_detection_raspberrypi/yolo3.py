@@ -4,19 +4,20 @@ import numpy as np
 import time
 import torch
 import torchvision
-import torchvision.transforms as transforms
 from torchvision.datasets import ImageFolder
 from torch.utils import data
 import PIL
-import numpy as np
+import argparse
+import threading
+from collections import deque
 from torch import nn
 from torchinfo import summary
 import torch.nn.functional as F
-import time
 from torch.autograd import Variable
 from sklearn.metrics import f1_score
 from torcheval.metrics.functional import multiclass_f1_score
-from models import NeuralNetwork
+from models import load_classifier
+from detections import decode_outputs
 # from picamera2 import Picamera2
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -25,9 +26,6 @@ device = "cuda" if torch.cuda.is_available() else "cpu"
 cv.startWindowThread()
 
 WHITE = (255, 255, 255)
-img = None
-img0 = None
-outputs = None
 
 # Load names of classes and get random colors
 classes = open("coco.names").read().strip().split("\n")
@@ -35,13 +33,26 @@ np.random.seed(42)
 colors = np.random.randint(0, 255, size=(len(classes), 3), dtype="uint8")
 
 # Give the configuration and weight files for the model and load the network.
-net = cv.dnn.readNetFromDarknet("yolov3-tiny.cfg", "yolov3-tiny.weights")
-# net.setPreferableBackend(cv.dnn.DNN_BACKEND_OPENCV)
-net.setPreferableTarget(cv.dnn.DNN_TARGET_CPU)
+def load_network():
+    network = cv.dnn.readNetFromDarknet("yolov3-tiny.cfg", "yolov3-tiny.weights")
+    # network.setPreferableBackend(cv.dnn.DNN_BACKEND_OPENCV)
+    network.setPreferableTarget(cv.dnn.DNN_TARGET_CPU)
+    return network
+
+net = load_network()
 
-model = NeuralNetwork().to(device)
-model.load_state_dict(torch.load('model_weights.pth'))
-model.eval()
+# Violence classifier, loaded by use_classifier() from main()
+model = None
+model_device = device
+
+def use_classifier(path):
+    """Load an fp32 state dict or a compact checkpoint from compact_classifier.py"""
+    global model, model_device, ROI_SIZE
+    model = load_classifier(path, device)
+    # Quantized models keep no float parameters and run on the CPU
+    weights = next(model.parameters(), None)
+    model_device = weights.device if weights is not None else "cpu"
+    ROI_SIZE = model.input_size
 
 # determine the output layer
 ln = net.getLayerNames()
@@ -49,17 +60,34 @@ ln = [ln[i - 1] for i in net.getUnconnectedOutLayers()]
 
 labels = ['nonviolence', 'violence']
 
-def load_image(image):
-    global img, img0, outputs, ln
+# Only these detections are drawn and passed to the classifier
+target_class_ids = np.array([classes.index(name) for name in ("person", "knife")])
+
+# ROIs of one frame are classified together in a reused batch tensor,
+# one per inference thread
+ROI_SIZE = 224
+MAX_ROIS = 32
+roi_batches = threading.local()
 
-    img0 = image
-    img = img0.copy()
+def load_image(image, network=None):
+    """Detect and classify on one frame; returns an annotated copy"""
+    img = image.copy()
+    draw_detections(img, detect(image, network))
+    return img
 
-    blob = cv.dnn.blobFromImage(img, 1 / 255.0, (416, 416), swapRB=True, crop=False)
 
-    net.setInput(blob)
+def detect(image, network=None):
+    """Run YOLO and the violence classifier on one frame.
+
+    Returns the NMS survivors as (box, classID, confidence, label) tuples,
+    box being [x, y, w, h] and label the classifier's verdict (or None).
+    """
+    network = network or net
+    blob = cv.dnn.blobFromImage(image, 1 / 255.0, (416, 416), swapRB=True, crop=False)
+
+    network.setInput(blob)
     t0 = time.time()
-    outputs = net.forward(ln)
+    outputs = network.forward(ln)
     t = time.time() - t0
 
     # combine the 3 output groups into 1 (10647, 85)
@@ -68,78 +96,417 @@ def load_image(image):
     # small objects (8112, 85)
     outputs = np.vstack(outputs)
 
-    post_process(img, outputs, 0.5)
-    cv.imshow("window", img)
     # cv.displayOverlay("window", f"forward propagation time={t:.3}")
-    # cv.waitKey(0)
-
+    return post_process(image, outputs, 0.5)
 
-def post_process(img, outputs, conf):
-    H, W = img.shape[:2]
 
-    boxes = []
-    confidences = []
-    classIDs = []
+def post_process(frame, outputs, conf):
+    H, W = frame.shape[:2]
 
-    for output in outputs:
-        scores = output[5:]
-        classID = np.argmax(scores)
-        confidence = scores[classID]
-        if confidence > conf and classes[classID] == "knife" or classes[classID] == "person":
-            x, y, w, h = output[:4] * np.array([W, H, W, H])
-            p0 = int(x - w // 2), int(y - h // 2)
-            p1 = int(x + w // 2), int(y + h // 2)
-            boxes.append([*p0, int(w), int(h)])
-            confidences.append(float(confidence))
-            classIDs.append(classID)
-            # cv.rectangle(img, p0, p1, WHITE, 1)
+    boxes, confidences, classIDs = decode_outputs(outputs, W, H, conf, target_class_ids)
 
     indices = cv.dnn.NMSBoxes(boxes, confidences, conf, conf - 0.1)
-    if len(indices) > 0:
-        for i in indices.flatten():
-            (x, y) = (boxes[i][0], boxes[i][1])
-            (w, h) = (boxes[i][2], boxes[i][3])
-            color = [int(c) for c in colors[classIDs[i]]]
-            cv.rectangle(img, (x, y), (x + w, y + h), color, 2)
-            text = "{}: {:.4f}".format(classes[classIDs[i]], confidences[i])
-            cv.putText(img, text, (x, y - 5), cv.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-            # Use model to predict whether is violence or not
-            roi = img0[y:y+h, x:x+w]
-            roi = cv.resize(roi, (224, 224))
-            roi = transforms.ToTensor()(roi).unsqueeze(0).to(device)
-            output = model(roi)
-            _, predicted = torch.max(output, 1)
-            print(labels[predicted.item()]) 
-
-
-
-
-# define a video capture object
-vid = cv.VideoCapture("vid.mp4")
-## Create an instance of the PiCamera2 object
-## Initialize and start realtime video capture
-## Set the resolution of the camera preview
-# picam2 = Picamera2()
-# picam2.configure(
-#     picam2.create_preview_configuration(main={"format": "XRGB8888", "size": (640, 480)})
-# )
-
-# cam = Picamera2()
-# cam.preview_configuration.main.size = (640, 360)
-# cam.preview_configuration.main.format = "RGB888"
-# cam.preview_configuration.controls.FrameRate = 30
-# cam.preview_configuration.align()
-# cam.configure("preview")
-# cam.start()
-while True:
-    ret, image = vid.read()
-    if ret:
-        load_image(image)
-
-    # image = cam.capture_array()
-    # load_image(image)
-    if cv.waitKey(1) & 0xFF == ord("q"):
-        break
-# cam.stop
-vid.release()
-cv.destroyAllWindows()
+    if len(indices) == 0:
+        return []
+    indices = indices.flatten()
+    # Use model to predict whether is violence or not, all boxes at once
+    verdicts = classify_rois(frame, [boxes[i] for i in indices])
+    for label in verdicts:
+        if label is not None:
+            print(label)
+    return [(boxes[i], classIDs[i], confidences[i], label) for i, label in zip(indices, verdicts)]
+
+
+def draw_detections(img, detections):
+    for (x, y, w, h), classID, confidence, _ in detections:
+        color = [int(c) for c in colors[classID]]
+        cv.rectangle(img, (x, y), (x + w, y + h), color, 2)
+        text = "{}: {:.4f}".format(classes[classID], confidence)
+        cv.putText(img, text, (x, y - 5), cv.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+
+def classify_rois(image, rects):
+    """Classify every (x, y, w, h) crop of image in one forward pass.
+
+    Returns one label per rect, or None for a rect lying outside the image.
+    Crops are scaled to [0, 1] CHW like torchvision's ToTensor() did.
+    """
+    H, W = image.shape[:2]
+    crops = []
+    for x, y, w, h in rects:
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, W), min(y + h, H)
+        crops.append(image[y0:y1, x0:x1] if x1 > x0 and y1 > y0 else None)
+
+    valid = [i for i, crop in enumerate(crops) if crop is not None]
+    results = [None] * len(rects)
+    if not valid:
+        return results
+
+    if not hasattr(roi_batches, 'batch'):
+        roi_batches.batch = torch.empty((MAX_ROIS, 3, ROI_SIZE, ROI_SIZE), dtype=torch.float32, device=model_device)
+    batch = roi_batches.batch if len(valid) <= MAX_ROIS else torch.empty(
+        (len(valid), 3, ROI_SIZE, ROI_SIZE), dtype=torch.float32, device=model_device)
+    batch = batch[:len(valid)]
+    for slot, i in enumerate(valid):
+        roi = cv.resize(crops[i], (ROI_SIZE, ROI_SIZE))
+        batch[slot].copy_(torch.from_numpy(roi).permute(2, 0, 1))
+    batch.div_(255.0)
+
+    with torch.no_grad():
+        predicted = model(batch).argmax(1).tolist()
+    for i, p in zip(valid, predicted):
+        results[i] = labels[p]
+    return results
+
+
+
+
+
+
+class FrameQueue:
+    """Bounded hand-off between pipeline stages.
+
+    When full, policy decides what gives: "drop-oldest" evicts the oldest
+    queued frame (lowest latency), "drop-newest" discards the incoming one,
+    and "block" makes the producer wait.
+    """
+
+    def __init__(self, maxsize, policy="drop-oldest"):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()
+        self.dropped = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def put(self, item):
+        with self.cond:
+            while self.policy == "block" and len(self.items) >= self.maxsize and not self.closed:
+                self.cond.wait()
+            if len(self.items) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == "drop-newest":
+                    return
+                self.items.popleft()
+            self.items.append(item)
+            self.cond.notify_all()
+
+    def get(self):
+        """Next item, or None once the queue is closed and drained"""
+        with self.cond:
+            while not self.items and not self.closed:
+                self.cond.wait()
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def depth(self):
+        return len(self.items)
+
+
+class StageStats:
+    """Frames handled by one stage and its rate since the last report"""
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.lock = threading.Lock()
+        self.last_frames = 0
+        self.last_time = time.time()
+
+    def tick(self):
+        with self.lock:
+            self.frames += 1
+
+    def fps(self):
+        with self.lock:
+            now = time.time()
+            rate = (self.frames - self.last_frames) / max(now - self.last_time, 1e-9)
+            self.last_frames, self.last_time = self.frames, now
+            return rate
+
+
+class MotionGate:
+    """Cheap change detector on a small, blurred grayscale copy of each frame.
+
+    A frame counts as changed when more than min_changed of its pixels
+    differ by over pixel_threshold from the reference, which is the frame
+    the detector last ran on, so slow drift still triggers eventually.
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, min_changed=0.01):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.reference = None
+
+    def small(self, image):
+        H, W = image.shape[:2]
+        small = cv.resize(image, (self.width, max(1, H * self.width // W)), interpolation=cv.INTER_AREA)
+        return cv.GaussianBlur(cv.cvtColor(small, cv.COLOR_BGR2GRAY), (5, 5), 0)
+
+    def changed(self, small):
+        if self.reference is None:
+            return True
+        diff = cv.absdiff(small, self.reference)
+        return np.count_nonzero(diff > self.pixel_threshold) > self.min_changed * diff.size
+
+    def reset(self, small):
+        self.reference = small
+
+
+class BoxTracker:
+    """Carries detections forward between full detections.
+
+    Each box's patch from the last detected frame is searched for within
+    margin pixels of its previous position by normalized template matching
+    on a half-resolution grayscale frame. A box whose best match scores
+    below min_score keeps its last position.
+    """
+
+    def __init__(self, scale=0.5, margin=16, min_score=0.5):
+        self.scale = scale
+        self.margin = margin
+        self.min_score = min_score
+        self.tracks = []
+
+    def gray(self, image):
+        small = cv.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv.INTER_AREA)
+        return cv.cvtColor(small, cv.COLOR_BGR2GRAY)
+
+    def reset(self, image, detections):
+        gray = self.gray(image)
+        H, W = gray.shape
+        self.tracks = []
+        for detection in detections:
+            x, y, w, h = [int(v * self.scale) for v in detection[0]]
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + w, W), min(y + h, H)
+            template = gray[y0:y1, x0:x1].copy() if x1 - x0 >= 4 and y1 - y0 >= 4 else None
+            self.tracks.append([detection, template, (x0, y0)])
+
+    def update(self, image):
+        gray = self.gray(image)
+        H, W = gray.shape
+        for track in self.tracks:
+            detection, template, (x, y) = track
+            if template is None:
+                continue
+            th, tw = template.shape
+            x0, y0 = max(x - self.margin, 0), max(y - self.margin, 0)
+            window = gray[y0:min(y + th + self.margin, H), x0:min(x + tw + self.margin, W)]
+            if window.shape[0] < th or window.shape[1] < tw:
+                continue
+            _, score, _, (dx, dy) = cv.minMaxLoc(cv.matchTemplate(window, template, cv.TM_CCOEFF_NORMED))
+            if score < self.min_score:
+                continue
+            box = detection[0]
+            shift_x = int((x0 + dx - x) / self.scale)
+            shift_y = int((y0 + dy - y) / self.scale)
+            track[0] = ([box[0] + shift_x, box[1] + shift_y, box[2], box[3]], *detection[1:])
+            track[2] = (x0 + dx, y0 + dy)
+        return [track[0] for track in self.tracks]
+
+
+class DetectionScheduler:
+    """Decides, frame by frame, whether to run the full detector.
+
+    The detector runs on changed frames, but no more often than keeps its
+    measured cost within the frame budget of target_fps: if a detection
+    takes 0.2 s and the target is 15 fps, changed frames are detected
+    every third frame and tracked in between. Every max_interval frames
+    it runs regardless, to catch changes the motion gate missed.
+    """
+
+    def __init__(self, target_fps=15.0, max_interval=30):
+        self.target_fps = target_fps
+        self.max_interval = max_interval
+        self.detect_time = None
+        self.since = max_interval
+
+    def interval(self):
+        if self.detect_time is None:
+            return 1
+        return min(self.max_interval, max(1, int(np.ceil(self.detect_time * self.target_fps))))
+
+    def should_detect(self, changed):
+        self.since += 1
+        return self.since >= self.max_interval or (changed and self.since >= self.interval())
+
+    def record(self, seconds):
+        # Exponential moving average, so one slow frame doesn't stall detection
+        self.detect_time = seconds if self.detect_time is None else 0.8 * self.detect_time + 0.2 * seconds
+        self.since = 0
+
+
+class FrameAnalyzer:
+    """Runs the detector only when needed and tracks boxes in between"""
+
+    def __init__(self, network=None, gating=True, target_fps=15.0, max_interval=30, motion_threshold=0.01):
+        self.network = network
+        self.gating = gating
+        self.gate = MotionGate(min_changed=motion_threshold)
+        self.tracker = BoxTracker()
+        self.scheduler = DetectionScheduler(target_fps, max_interval)
+        self.detections = []
+        self.frames = 0
+        self.detected = 0
+
+    def process(self, image):
+        """Annotated copy of image, from a fresh or carried-forward detection"""
+        self.frames += 1
+        if not self.gating:
+            self.detected += 1
+            return load_image(image, self.network)
+
+        small = self.gate.small(image)
+        changed = self.gate.changed(small)
+        if self.scheduler.should_detect(changed):
+            t0 = time.time()
+            self.detections = detect(image, self.network)
+            self.scheduler.record(time.time() - t0)
+            self.gate.reset(small)
+            self.tracker.reset(image, self.detections)
+            self.detected += 1
+        elif changed:
+            self.detections = self.tracker.update(image)
+        # Unchanged frames reuse the last detections as they are
+
+        img = image.copy()
+        draw_detections(img, self.detections)
+        return img
+
+
+def open_source(source):
+    """Return a read() callable giving BGR frames, or None at end of stream"""
+    if source == "picamera":
+        from picamera2 import Picamera2
+        cam = Picamera2()
+        cam.preview_configuration.main.size = (640, 360)
+        cam.preview_configuration.main.format = "RGB888"
+        cam.preview_configuration.controls.FrameRate = 30
+        cam.preview_configuration.align()
+        cam.configure("preview")
+        cam.start()
+        return cam.capture_array, cam.stop
+
+    vid = cv.VideoCapture(int(source) if source.isdigit() else source)
+
+    def read():
+        ret, image = vid.read()
+        return image if ret else None
+    return read, vid.release
+
+
+def capture_stage(read, frames, stats, stop):
+    seq = 0
+    while not stop.is_set():
+        image = read()
+        if image is None:
+            break
+        stats.tick()
+        frames.put((seq, image))
+        seq += 1
+    frames.close()
+
+
+def inference_stage(analyzer, frames, results, stats):
+    while True:
+        item = frames.get()
+        if item is None:
+            break
+        seq, image = item
+        results.put((seq, analyzer.process(image)))
+        stats.tick()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Violence detection on a video stream")
+    parser.add_argument("--source", default="vid.mp4", help='video file, camera index, or "picamera"')
+    parser.add_argument("--workers", type=int, default=1, help="inference threads, each with its own network")
+    parser.add_argument("--queue-size", type=int, default=2, help="frames buffered between stages")
+    parser.add_argument("--policy", choices=["drop-oldest", "drop-newest", "block"],
+                        help="what to do with frames when inference falls behind "
+                             "(default: drop-oldest for cameras, block for files)")
+    parser.add_argument("--classifier", default="model_weights.pth",
+                        help="violence classifier weights, fp32 or a compact_classifier.py checkpoint")
+    parser.add_argument("--no-gating", action="store_true",
+                        help="run the full detector on every frame instead of only on changed ones")
+    parser.add_argument("--target-fps", type=float, default=15.0,
+                        help="frame rate the adaptive detection interval aims to sustain")
+    parser.add_argument("--max-skip", type=int, default=30, help="frames between forced full detections")
+    parser.add_argument("--motion-threshold", type=float, default=0.01,
+                        help="fraction of changed pixels that counts as motion")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="seconds between counter reports")
+    parser.add_argument("--no-display", action="store_true", help="run headless")
+    args = parser.parse_args()
+    use_classifier(args.classifier)
+
+    read, release = open_source(args.source)
+    live = args.source == "picamera" or args.source.isdigit()
+    frames = FrameQueue(args.queue_size, args.policy or ("drop-oldest" if live else "block"))
+    results = FrameQueue(args.queue_size, "drop-oldest")
+    stop = threading.Event()
+    stats = {name: StageStats(name) for name in ("capture", "inference", "render")}
+
+    capture = threading.Thread(target=capture_stage, args=(read, frames, stats["capture"], stop), daemon=True)
+    # With several workers, each one gates and tracks its own share of frames
+    analyzers = [
+        FrameAnalyzer(net if i == 0 else load_network(), not args.no_gating,
+                      args.target_fps, args.max_skip, args.motion_threshold)
+        for i in range(max(1, args.workers))
+    ]
+    workers = [
+        threading.Thread(target=inference_stage, args=(analyzer, frames, results, stats["inference"]), daemon=True)
+        for analyzer in analyzers
+    ]
+    capture.start()
+    for worker in workers:
+        worker.start()
+
+    def close_results():
+        for worker in workers:
+            worker.join()
+        results.close()
+    threading.Thread(target=close_results, daemon=True).start()
+
+    # Rendering stays on the main thread, which is where imshow must run
+    last_seq = -1
+    last_report = time.time()
+    while True:
+        item = results.get()
+        if item is None:
+            break
+        seq, img = item
+        # Workers can finish out of order; never show an older frame
+        if seq > last_seq:
+            last_seq = seq
+            if not args.no_display:
+                cv.imshow("window", img)
+            stats["render"].tick()
+        if not args.no_display and cv.waitKey(1) & 0xFF == ord("q"):
+            break
+
+        if time.time() - last_report >= args.stats_interval:
+            last_report = time.time()
+            print(" | ".join(f"{name} {stage.fps():.1f} fps" for name, stage in stats.items()),
+                  f"| queues: frames {frames.depth()}/{frames.maxsize} (dropped {frames.dropped}),",
+                  f"results {results.depth()}/{results.maxsize} (dropped {results.dropped})",
+                  f"| full detections on {sum(a.detected for a in analyzers)}/{sum(a.frames for a in analyzers)} frames")
+
+    stop.set()
+    frames.close()
+    release()
+    cv.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,103 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-import redis
+import json
+import os
+import threading
+import time
 from datetime import datetime
 
 from config import Config
 from services.database_service import DatabaseService
 from services.chatbot_service import ChatbotService
 from services.auth_service import AuthService
+from services.credential_verifier import VerifierBusy
+from services.metrics import metrics, SamplingProfiler
+from services.rate_limit_storage import ShardedMemoryStorage
+from services.session_store import RedisSessionInterface
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 # Initialize extensions
 CORS(app)
-redis_client = redis.from_url(Config.REDIS_URL)
+
+def _limiter_storage_options():
+    if Config.RATELIMIT_STORAGE_URL.startswith(ShardedMemoryStorage.STORAGE_SCHEME[0]):
+        return {'shards': Config.RATELIMIT_SHARDS}
+    if Config.RATELIMIT_STORAGE_URL.startswith('redis'):
+        # Pooled, lazily connected; a dead Redis fails fast into the fallback
+        return {
+            'max_connections': Config.REDIS_MAX_CONNECTIONS,
+            'socket_timeout': Config.REDIS_SOCKET_TIMEOUT,
+            'socket_connect_timeout': Config.REDIS_SOCKET_TIMEOUT
+        }
+    return {}
+
 limiter = Limiter(
-    app,
-    key_func=get_remote_address,
-    storage_uri=Config.RATELIMIT_STORAGE_URL
+    get_remote_address,
+    app=app,
+    storage_uri=Config.RATELIMIT_STORAGE_URL,
+    storage_options=_limiter_storage_options()
 )
 
+if Config.SESSION_BACKEND == 'redis' and Config.REDIS_URL:
+    app.session_interface = RedisSessionInterface(Config.REDIS_URL)
+
 # Initialize services
 db_service = DatabaseService()
 chatbot_service = ChatbotService()
 
+def _collect_service_metrics():
+    """Scrape-time samples from the services' own counters"""
+    for stripe in db_service.lock_metrics():
+        labels = {'stripe': str(stripe['stripe'])}
+        yield 'transfer_lock_acquisitions_total', 'counter', labels, stripe['acquisitions']
+        yield 'transfer_lock_contended_total', 'counter', labels, stripe['contended']
+        yield 'transfer_lock_wait_seconds_total', 'counter', labels, stripe['wait_seconds_total']
+        yield 'transfer_lock_hold_seconds_total', 'counter', labels, stripe['hold_seconds_total']
+    for name, value in chatbot_service.cache.stats().items():
+        yield 'intent_cache_events_total', 'counter', {'event': name}, value
+    classifier = chatbot_service.classifier.stats()
+    yield 'intent_local_total', 'counter', {'result': 'served'}, classifier['served_locally']
+    yield 'intent_local_total', 'counter', {'result': 'deferred'}, classifier['deferred']
+    yield 'llm_in_flight', 'gauge', {}, chatbot_service.llm.in_flight
+    yield 'llm_circuit_open', 'gauge', {}, int(chatbot_service.llm.breaker.state != 'closed')
+    yield 'token_cache_events_total', 'counter', {'event': 'hit'}, AuthService.token_cache.hits
+    yield 'token_cache_events_total', 'counter', {'event': 'miss'}, AuthService.token_cache.misses
+    yield 'auth_verify_pending', 'gauge', {}, db_service.verifier.pending()
+    if db_service.views is not None:
+        views = db_service.views.stats()
+        yield 'account_view_cache_events_total', 'counter', {'event': 'hit'}, views['hits']
+        yield 'account_view_cache_events_total', 'counter', {'event': 'miss'}, views['misses']
+
+metrics.register_collector(_collect_service_metrics)
+
+@app.before_request
+def start_request_timer():
+    request.started_at = time.perf_counter()
+    if Config.PROFILING_ENABLED and request.headers.get('X-Profile') == '1':
+        request.profiler = SamplingProfiler(threading.get_ident(), Config.PROFILE_INTERVAL)
+        request.profiler.start()
+
+@app.after_request
+def record_request_metrics(response):
+    started_at = getattr(request, 'started_at', None)
+    if started_at is not None:
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started_at,
+                        'Request latency per endpoint',
+                        endpoint=request.endpoint or 'unknown', method=request.method,
+                        status=str(response.status_code))
+    profiler = getattr(request, 'profiler', None)
+    if profiler is not None:
+        os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(Config.PROFILE_DIR, f"{request.endpoint or 'unknown'}-{time.time_ns()}.folded")
+        with open(path, 'w') as f:
+            f.write(profiler.stop())
+        response.headers['X-Profile-File'] = path
+    return response
+
 @app.route('/')
 def home():
     """Home page"""
@@ -66,15 +138,53 @@ def login():
         else:
             return jsonify({'error': 'Invalid credentials'}), 401
             
+    except VerifierBusy:
+        return jsonify({'error': 'Too many login attempts in progress. Please try again shortly.'}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': 'Authentication failed'}), 500
 
 @app.route('/api/auth/logout', methods=['POST'])
 def logout():
     """Logout user"""
+    token = AuthService.get_request_token()
+    if token:
+        AuthService.revoke_token(token)
+    user_info = session.get('user_info')
+    if user_info:
+        chatbot_service.conversations.clear(user_info['account_number'])
     session.clear()
     return jsonify({'success': True, 'message': 'Logged out successfully'})
 
+def _complete_chat_response(response, user_info):
+    """Attach account data to a parsed chat intent"""
+    if response['intent'] == 'GET_BALANCE':
+        account_number = response.get('account_number') or user_info['account_number']
+        view = db_service.get_account_view(account_number)
+        if view:
+            summary = view['summary']
+            response['data'] = summary
+            response['message'] = f"Account balance for {summary['name']}: ${summary['balance']:.2f}"
+        else:
+            response['message'] = "Account not found"
+    
+    elif response['intent'] == 'TRANSFER_MONEY':
+        # Return transfer confirmation data
+        response['requires_confirmation'] = True
+        response['transfer_data'] = {
+            'to_account': response.get('account_number'),
+            'amount': response.get('amount', 0)
+        }
+    
+    elif response['intent'] == 'ACCOUNT_INFO':
+        view = db_service.get_account_view(user_info['account_number'])
+        if view:
+            summary = view['summary']
+            response['data'] = view['details']
+            response['message'] = (f"Account Information:\nName: {summary['name']}\n"
+                                   f"Account: {summary['account_number']}\nBalance: ${summary['balance']:.2f}")
+    
+    return response
+
 @app.route('/api/chat', methods=['POST'])
 @AuthService.token_required
 @limiter.limit("20 per minute")
@@ -88,41 +198,39 @@ def chat():
             return jsonify({'error': 'Message is required'}), 400
         
         user_info = session.get('user_info')
-        response = chatbot_service.process_query(message, user_info['name'])
-        
-        # Handle different intents
-        if response['intent'] == 'GET_BALANCE':
-            account_number = response.get('account_number') or user_info['account_number']
-            user = db_service.get_user_by_account(account_number)
-            if user:
-                response['data'] = {
-                    'balance': user.balance,
-                    'account_number': user.account_number,
-                    'name': user.name
-                }
-                response['message'] = f"Account balance for {user.name}: ${user.balance:.2f}"
-            else:
-                response['message'] = "Account not found"
-        
-        elif response['intent'] == 'TRANSFER_MONEY':
-            # Return transfer confirmation data
-            response['requires_confirmation'] = True
-            response['transfer_data'] = {
-                'to_account': response.get('account_number'),
-                'amount': response.get('amount', 0)
-            }
-        
-        elif response['intent'] == 'ACCOUNT_INFO':
-            user = db_service.get_user_by_account(user_info['account_number'])
-            if user:
-                response['data'] = user.to_dict()
-                response['message'] = f"Account Information:\nName: {user.name}\nAccount: {user.account_number}\nBalance: ${user.balance:.2f}"
-        
-        return jsonify(response)
+        # The LLM call runs on the shared client loop; this thread only waits for it
+        response = chatbot_service.process_query(
+            message, user_info['name'], conversation_id=user_info['account_number'])
+        return jsonify(_complete_chat_response(response, user_info))
         
     except Exception as e:
         return jsonify({'error': 'Failed to process message'}), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+@AuthService.token_required
+@limiter.limit("20 per minute")
+def chat_stream():
+    """Process chat message, streaming the reply as Server-Sent Events"""
+    data = request.get_json(silent=True) or {}
+    message = (data.get('message') or '').strip()
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    user_info = session.get('user_info')
+    
+    def events():
+        try:
+            for event, payload in chatbot_service.stream_query(
+                    message, user_info['name'], conversation_id=user_info['account_number']):
+                if event == 'done':
+                    payload = _complete_chat_response(payload, user_info)
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': 'Failed to process message'})}\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/transfer/confirm', methods=['POST'])
 @AuthService.token_required
 @limiter.limit("10 per minute")
@@ -156,19 +264,72 @@ def confirm_transfer():
     except Exception as e:
         return jsonify({'error': 'Transfer failed'}), 500
 
+@app.route('/api/transfer/batch', methods=['POST'])
+@AuthService.token_required
+@limiter.limit("10 per minute")
+def batch_transfer():
+    """Apply many transfers from the current user's account in one request"""
+    try:
+        data = request.get_json()
+        transfers = data.get('transfers') or []
+        atomic = bool(data.get('atomic', True))
+
+        if not isinstance(transfers, list) or not transfers:
+            return jsonify({'error': 'At least one transfer is required'}), 400
+        if len(transfers) > Config.MAX_BATCH_TRANSFERS:
+            return jsonify({'error': f'A batch may contain at most {Config.MAX_BATCH_TRANSFERS} transfers'}), 400
+
+        user_info = session.get('user_info')
+        from_account = user_info['account_number']
+        legs = [
+            (from_account, str(item.get('to_account', '')).strip(), float(item.get('amount', 0)))
+            for item in transfers
+        ]
+
+        results = db_service.transfer_many(legs, atomic=atomic)
+        updated_user = db_service.get_user_by_account(from_account)
+        session['user_info']['balance'] = updated_user.balance
+
+        body = {
+            'success': all(ok for ok, _ in results),
+            'results': [
+                {
+                    'to_account': to_account,
+                    'amount': amount,
+                    'success': ok,
+                    'message': message
+                }
+                for (_, to_account, amount), (ok, message) in zip(legs, results)
+            ],
+            'new_balance': updated_user.balance
+        }
+        if atomic and not body['success']:
+            body['error'] = 'Batch rejected'
+            return jsonify(body), 400
+        return jsonify(body)
+
+    except (ValueError, TypeError, AttributeError):
+        return jsonify({'error': 'Invalid transfer list'}), 400
+    except Exception as e:
+        return jsonify({'error': 'Batch transfer failed'}), 500
+
 @app.route('/api/user/<account_number>')
 @AuthService.token_required
 def get_user_info(account_number):
     """Get user information by account number"""
-    user = db_service.get_user_by_account(account_number)
-    if user:
-        return jsonify({
-            'name': user.name,
-            'account_number': user.account_number,
-            'balance': user.balance
-        })
+    view = db_service.get_account_view(account_number)
+    if view:
+        return Response(view['summary_json'], mimetype='application/json')
     return jsonify({'error': 'User not found'}), 404
 
+@app.route('/metrics')
+@limiter.exempt
+def prometheus_metrics():
+    """Latency histograms and service counters in Prometheus text format"""
+    if not Config.METRICS_ENABLED:
+        return jsonify({'error': 'Not found'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(429)
 def ratelimit_handler(e):
     return jsonify({'error': 'Rate limit exceeded. Please try again later.'}), 429
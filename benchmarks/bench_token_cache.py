@@ -0,0 +1,40 @@
+"""Compare per-request token verification cost with and without the JWT cache.
+
+Usage: python benchmarks/bench_token_cache.py [--requests 100000] [--tokens 100]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.user import User
+from services.auth_service import AuthService
+
+def run(label, verify, tokens, requests):
+    start = time.perf_counter()
+    for i in range(requests):
+        assert verify(tokens[i % len(tokens)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {requests / elapsed:>12,.0f} req/s  {elapsed / requests * 1e6:>8.2f} us/req")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100_000)
+    parser.add_argument('--tokens', type=int, default=100, help='distinct live tokens in rotation')
+    args = parser.parse_args()
+
+    tokens = [
+        User.from_dict({'name': f'user{i}', 'account_number': str(i), 'balance': 0}).generate_token()
+        for i in range(args.tokens)
+    ]
+
+    uncached = run('jwt.decode', AuthService._decode, tokens, args.requests)
+    cached = run('cached', AuthService.verify_token, tokens, args.requests)
+    print(f"speedup        {uncached / cached:>12.1f}x  (cache hits={AuthService.token_cache.hits:,}, "
+          f"misses={AuthService.token_cache.misses:,})")
+
+if __name__ == '__main__':
+    main()
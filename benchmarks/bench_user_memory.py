@@ -0,0 +1,60 @@
+"""Measure resident memory per account for models.user.User.
+
+Usage: python benchmarks/bench_user_memory.py [--count 1000000]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.user import User
+
+HASH = "$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewdBdXfs2Stk5v96"
+
+def make_records(count):
+    return [
+        {
+            'name': f'user{i}',
+            'account_number': str(i),
+            'balance': 100.0 + i % 1000,
+            'auth_code_hash': HASH,
+            'created_at': '2024-01-01T00:00:00',
+            'last_login': None,
+            'is_active': True
+        }
+        for i in range(count)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    records = make_records(args.count)
+    gc.collect()
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    users = [User.from_dict(record) for record in records]
+    elapsed = time.perf_counter() - start
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_account = (after - before) / args.count
+    print(f"accounts:          {args.count:,}")
+    print(f"hydrate time:      {elapsed:.2f} s ({elapsed / args.count * 1e6:.2f} us/account)")
+    print(f"bytes per account: {per_account:.0f} (excluding strings shared with the parsed JSON)")
+    print(f"total:             {(after - before) / 2**20:.1f} MiB")
+
+    start = time.perf_counter()
+    for user in users:
+        user.to_dict()
+    print(f"to_dict:           {(time.perf_counter() - start) / args.count * 1e6:.2f} us/account")
+
+if __name__ == '__main__':
+    main()
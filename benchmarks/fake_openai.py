@@ -0,0 +1,108 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Replies with scripted TRANSFER|/BALANCE|/INFO/CHAT| lines after a fixed
+latency, supporting plain, streamed (SSE) and numbered batch prompts.
+
+Usage: python benchmarks/fake_openai.py [--port 8765] [--latency 0.05]
+Then point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NUMBERED_LINE = re.compile(r'^(\d+)\) (.*)$')
+NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+def scripted_reply(query: str) -> str:
+    """Pick a grammar line from simple keywords in the query"""
+    text = query.lower()
+    numbers = NUMBER.findall(text)
+    if any(word in text for word in ('transfer', 'send', 'pay')) and len(numbers) >= 2:
+        return f"TRANSFER|{numbers[1]}|{numbers[0]}"
+    if 'balance' in text:
+        return f"BALANCE|{numbers[0] if numbers else ''}"
+    if 'info' in text or 'details' in text:
+        return "INFO"
+    return "CHAT|Thanks for reaching out! I can help with balances and transfers."
+
+def extract_query(content: str) -> str:
+    match = re.search(r'Query: (.*)', content)
+    return match.group(1) if match else content
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.05
+    calls = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        content = body['messages'][-1]['content']
+        type(self).calls += 1
+
+        numbered = [NUMBERED_LINE.match(line) for line in content.splitlines()]
+        if numbered and all(numbered):
+            reply = '\n'.join(f"{m.group(1)}) {scripted_reply(extract_query(m.group(2)))}" for m in numbered)
+        else:
+            reply = scripted_reply(extract_query(content))
+
+        time.sleep(self.latency)
+        if body.get('stream'):
+            self._stream(reply)
+        else:
+            self._send_json({
+                'id': 'chatcmpl-fake', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': body.get('model', 'fake'),
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': reply}}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            })
+
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, reply: str):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        pieces = [reply[i:i + 4] for i in range(0, len(reply), 4)]
+        for piece in pieces:
+            chunk = {'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': 'fake', 'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+
+    def log_message(self, *args):
+        pass
+
+def start(port: int = 8765, latency: float = 0.05) -> ThreadingHTTPServer:
+    """Serve in a daemon thread and return the server"""
+    handler = type('Handler', (FakeOpenAIHandler,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-openai', daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+    server = start(args.port, args.latency)
+    print(f"Fake OpenAI listening on http://127.0.0.1:{args.port}/v1 (latency {args.latency}s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
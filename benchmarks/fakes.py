@@ -0,0 +1,102 @@
+"""In-memory stand-ins for the app's Redis dependency in benchmarks."""
+import fnmatch
+import threading
+import time
+
+class FakeRedis:
+    """The subset of redis.Redis the app and its caches use, held in a dict"""
+
+    def __init__(self, *args, **kwargs):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        return cls()
+
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = value if isinstance(value, bytes) else str(value).encode('utf-8')
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+            else:
+                self._expires.pop(key, None)
+            return True
+
+    def setex(self, key, seconds, value):
+        return self.set(key, value, ex=seconds)
+
+    def exists(self, *keys):
+        with self._lock:
+            return sum(self._alive(key) for key in keys)
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = int(self._data[key]) + amount if self._alive(key) else amount
+            self._data[key] = str(value).encode('utf-8')
+            return value
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                removed += self._data.pop(key, None) is not None
+                self._expires.pop(key, None)
+            return removed
+
+    def zadd(self, key, mapping):
+        with self._lock:
+            members = self._data.get(key) if self._alive(key) else None
+            if members is None:
+                members = self._data[key] = {}
+            added = sum(member not in members for member in mapping)
+            members.update({member: float(score) for member, score in mapping.items()})
+            return added
+
+    def zremrangebyscore(self, key, low, high):
+        low, high = float(low), float(high)
+        with self._lock:
+            members = self._data.get(key, {}) if self._alive(key) else {}
+            removed = [member for member, score in members.items() if low <= score <= high]
+            for member in removed:
+                del members[member]
+            return len(removed)
+
+    def zrange(self, key, start, end, withscores=False):
+        with self._lock:
+            members = self._data.get(key, {}) if self._alive(key) else {}
+            ordered = sorted(members.items(), key=lambda item: (item[1], item[0]))
+            ordered = ordered[start:None if end == -1 else end + 1]
+            return [(member.encode('utf-8'), score) if withscores else member.encode('utf-8')
+                    for member, score in ordered]
+
+    def keys(self, pattern='*'):
+        with self._lock:
+            return [key for key in list(self._data) if self._alive(key) and fnmatch.fnmatch(key, pattern)]
+
+    def flushall(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
@@ -0,0 +1,46 @@
+"""Generate a synthetic users.json with N accounts.
+
+Every account shares one auth code (default 1234) so load tests can log in
+as anyone. The hash uses a low bcrypt cost by default to keep generation
+fast; pass --rounds 12 to match production cost.
+
+Usage: python benchmarks/generate_users.py --count 100000 --output data/users.json
+"""
+import argparse
+import json
+import os
+import random
+import bcrypt
+
+def generate(count: int, auth_code: str = '1234', rounds: int = 4, seed: int = 42):
+    rng = random.Random(seed)
+    auth_code_hash = bcrypt.hashpw(auth_code.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    return [
+        {
+            'name': f'User{i}',
+            'account_number': str(i),
+            'balance': round(rng.uniform(100, 10000), 2),
+            'auth_code_hash': auth_code_hash,
+            'created_at': '2024-01-01T00:00:00',
+            'last_login': None,
+            'is_active': True
+        }
+        for i in range(1, count + 1)
+    ]
+
+def write(path: str, users):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(users, f, indent=2)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--output', default='data/users.json')
+    parser.add_argument('--auth-code', default='1234')
+    parser.add_argument('--rounds', type=int, default=4)
+    args = parser.parse_args()
+    write(args.output, generate(args.count, args.auth_code, args.rounds))
+    print(f"Wrote {args.count:,} accounts to {args.output}")
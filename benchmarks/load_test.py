@@ -0,0 +1,213 @@
+"""Drive a login/chat/transfer mix through the app and report tail latency.
+
+Runs entirely in-process: synthetic accounts in a temporary data directory,
+the fake OpenAI server from fake_openai.py, and an in-memory Redis, so the
+numbers reflect the app's own cost plus the configured LLM latency. Pass
+--json to keep a machine-readable result for comparing releases.
+
+Usage: python benchmarks/load_test.py [--users 10000] [--threads 16] [--requests 5000]
+           [--mix login=1,chat=6,transfer=3] [--backend json|sqlite] [--llm-latency 0.05]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_openai
+import generate_users
+from fakes import FakeRedis
+
+AUTH_CODE = '1234'
+
+CHAT_MESSAGES = [
+    "what's my balance",
+    "hello",
+    "thanks",
+    "show my account details",
+    "transfer {amount} to {account}",
+    "send {account} {amount} dollars",
+    "how much do I have left after rent?",
+    "can you explain how interest works on savings?",
+    "please send {amount} over to my friend, her account is {account}",
+    "is the branch open on sundays?",
+]
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - {'login', 'chat', 'transfer'}
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def prepare_environment(args, workdir):
+    """Write accounts, start the fake LLM and point the app's config at both"""
+    generate_users.write(os.path.join(workdir, 'data', 'users.json'),
+                         generate_users.generate(args.users, AUTH_CODE))
+    server = fake_openai.start(port=0, latency=args.llm_latency)
+
+    os.environ.update({
+        'OPENAI_API_KEY': 'bench',
+        'OPENAI_BASE_URL': f"http://127.0.0.1:{server.server_address[1]}/v1",
+        'REDIS_URL': 'redis://bench',
+        'RATELIMIT_STORAGE_URL': 'sharded-memory://',
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}" if args.backend == 'sqlite' else 'json://',
+        'LLM_BATCH_WINDOW_MS': str(args.batch_window_ms),
+    })
+
+    # Redis-backed features (INTENT_CACHE_BACKEND / SESSION_BACKEND=redis)
+    # get the in-memory stand-in
+    import redis
+    redis.from_url = FakeRedis.from_url
+    redis.Redis.from_url = FakeRedis.from_url
+    os.chdir(workdir)
+    return server
+
+class Worker(threading.Thread):
+    def __init__(self, app_module, args, mix, deadline_counter, results):
+        super().__init__(daemon=True)
+        self.client = app_module.app.test_client()
+        self.args = args
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.remaining = deadline_counter
+        self.results = results
+        self.rng = random.Random()
+        self.headers = {}
+
+    def _random_account(self):
+        return str(self.rng.randint(1, self.args.users))
+
+    def login(self):
+        account = self._random_account()
+        response = self.client.post('/api/auth/login', json={
+            'name': f'User{account}', 'account_number': account, 'auth_code': AUTH_CODE
+        })
+        if response.status_code == 200:
+            self.headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+        return response.status_code
+
+    def chat(self):
+        message = self.rng.choice(CHAT_MESSAGES).format(
+            account=self._random_account(), amount=self.rng.randint(1, 50))
+        response = self.client.post('/api/chat', json={'message': message}, headers=self.headers)
+        return response.status_code
+
+    def transfer(self):
+        response = self.client.post('/api/transfer/confirm', json={
+            'to_account': self._random_account(), 'amount': 0.01
+        }, headers=self.headers)
+        return response.status_code
+
+    def run(self):
+        self.login()
+        while self.remaining.take():
+            op = self.rng.choices(self.ops, self.weights)[0]
+            start = time.perf_counter()
+            status = getattr(self, op)()
+            self.results.append((op, time.perf_counter() - start, status))
+
+class RequestBudget:
+    def __init__(self, total):
+        self.left = total
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            if self.left <= 0:
+                return False
+            self.left -= 1
+            return True
+
+def report(results, elapsed):
+    by_op = defaultdict(list)
+    errors = defaultdict(int)
+    for op, latency, status in results:
+        by_op[op].append(latency)
+        by_op['all'].append(latency)
+        if status >= 400:
+            errors[op] += 1
+            errors['all'] += 1
+
+    rows = {}
+    print(f"{'operation':<10} {'count':>8} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for op in sorted(by_op, key=lambda name: (name == 'all', name)):
+        latencies = sorted(by_op[op])
+        rows[op] = {
+            'count': len(latencies),
+            'errors': errors[op],
+            'throughput': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+        }
+        row = rows[op]
+        print(f"{op:<10} {row['count']:>8} {row['errors']:>7} {row['throughput']:>9.1f} {row['p50_ms']:>9.2f} "
+              f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=5_000)
+    parser.add_argument('--mix', default='login=1,chat=6,transfer=3', help='operation weights')
+    parser.add_argument('--backend', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='seconds per fake completion')
+    parser.add_argument('--batch-window-ms', type=int, default=0, help='LLM_BATCH_WINDOW_MS for the run')
+    parser.add_argument('--rate-limits', action='store_true', help='keep the per-endpoint limits enabled')
+    parser.add_argument('--json', dest='json_path', help='also write results to this file')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    workdir = tempfile.mkdtemp(prefix='banking-bench-')
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    server = prepare_environment(args, workdir)
+
+    import app as app_module
+    app_module.limiter.enabled = args.rate_limits
+
+    results = []
+    budget = RequestBudget(args.requests)
+    workers = [Worker(app_module, args, mix, budget, results) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.requests:,} requests, {args.threads} threads, {args.users:,} accounts, "
+          f"{args.backend} backend, {args.llm_latency * 1000:.0f} ms LLM latency, {elapsed:.2f}s")
+    rows = report(results, elapsed)
+    chatbot = app_module.chatbot_service
+    print(f"LLM calls: {server.RequestHandlerClass.calls:,}  "
+          f"local intents: {chatbot.classifier.stats()['local_fraction']:.0%}  "
+          f"intent cache: {chatbot.cache.stats()}")
+    server.shutdown()
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'args': vars(args), 'elapsed': elapsed, 'operations': rows,
+                       'llm_calls': server.RequestHandlerClass.calls}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
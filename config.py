@@ -6,15 +6,86 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')  # None means the public API
     DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///banking.db'
-    REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379'
+    # Optional; with no REDIS_URL, rate limits and sessions stay in-process
+    REDIS_URL = os.environ.get('REDIS_URL') or None
+    REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS') or 50)
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT') or 0.5)
     
-    # Rate limiting
-    RATELIMIT_STORAGE_URL = REDIS_URL
+    # Journal records between background snapshots of users.json
+    JOURNAL_SNAPSHOT_INTERVAL = int(os.environ.get('JOURNAL_SNAPSHOT_INTERVAL') or 1000)
+    
+    # Number of lock stripes accounts are hashed onto for transfers
+    TRANSFER_LOCK_STRIPES = int(os.environ.get('TRANSFER_LOCK_STRIPES') or 64)
+    
+    # Largest number of legs accepted by /api/transfer/batch
+    MAX_BATCH_TRANSFERS = int(os.environ.get('MAX_BATCH_TRANSFERS') or 5000)
+    
+    # OpenAI calls: per-attempt timeout (seconds), retries, in-flight cap, HTTP pool size
+    OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT') or 10)
+    OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES') or 1)
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY') or 64)
+    LLM_POOL_SIZE = int(os.environ.get('LLM_POOL_SIZE') or 100)
+    
+    # Consecutive LLM failures before short-circuiting, and seconds before retrying
+    LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES') or 5)
+    LLM_BREAKER_RESET = float(os.environ.get('LLM_BREAKER_RESET') or 30)
+    
+    # Opt-in micro-batching of concurrent LLM classifications (0 disables).
+    # Batched queries share one prompt: names are left out, but whatever else
+    # a customer types (account numbers, amounts) sits next to other
+    # customers' queries, and a confused reply could echo it into theirs
+    LLM_BATCH_WINDOW_MS = int(os.environ.get('LLM_BATCH_WINDOW_MS') or 0)
+    LLM_BATCH_MAX_SIZE = int(os.environ.get('LLM_BATCH_MAX_SIZE') or 16)
+    
+    # Intent cache in front of the LLM: 'memory' or 'redis' (uses REDIS_URL)
+    INTENT_CACHE_BACKEND = os.environ.get('INTENT_CACHE_BACKEND') or 'memory'
+    INTENT_CACHE_SIZE = int(os.environ.get('INTENT_CACHE_SIZE') or 10000)
+    INTENT_CACHE_TTL = int(os.environ.get('INTENT_CACHE_TTL') or 3600)
+    
+    # Per-user conversation history sent with follow-up queries: verbatim
+    # turns kept, prompt token budget, summary size, conversations, idle TTL
+    CONVERSATION_MAX_TURNS = int(os.environ.get('CONVERSATION_MAX_TURNS') or 6)
+    CONVERSATION_TOKEN_BUDGET = int(os.environ.get('CONVERSATION_TOKEN_BUDGET') or 600)
+    CONVERSATION_SUMMARY_TOKENS = int(os.environ.get('CONVERSATION_SUMMARY_TOKENS') or 150)
+    CONVERSATION_MAX_SESSIONS = int(os.environ.get('CONVERSATION_MAX_SESSIONS') or 10000)
+    CONVERSATION_TTL = int(os.environ.get('CONVERSATION_TTL') or 1800)
+    
+    # Minimum rule confidence to answer locally without the LLM (above 1 disables)
+    LOCAL_INTENT_THRESHOLD = float(os.environ.get('LOCAL_INTENT_THRESHOLD') or 0.9)
+    
+    # Rate limiting: Redis when configured (counting in-process while it is
+    # unreachable), otherwise sliding windows in sharded in-process counters
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL') or REDIS_URL or 'sharded-memory://'
+    RATELIMIT_STRATEGY = os.environ.get('RATELIMIT_STRATEGY') or 'moving-window'
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
+    RATELIMIT_SHARDS = int(os.environ.get('RATELIMIT_SHARDS') or 16)
     RATELIMIT_DEFAULT = "100 per hour"
     
+    # Session storage: 'cookie' (signed, client-side) or 'redis' (uses REDIS_URL)
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND') or 'cookie'
+    
     # JWT settings
     JWT_EXPIRATION_DELTA = 3600  # 1 hour
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE') or 10000)
+    # How often each worker re-reads tokens revoked by other workers (seconds)
+    REVOCATION_POLL_SECONDS = float(os.environ.get('REVOCATION_POLL_SECONDS') or 1)
+    
+    # Cached balance/account-info views, invalidated per account on write (0 disables)
+    ACCOUNT_VIEW_CACHE_SIZE = int(os.environ.get('ACCOUNT_VIEW_CACHE_SIZE') or 10000)
+    
+    # Login verification: bcrypt worker processes, queue limit, cache TTL (seconds)
+    AUTH_VERIFY_WORKERS = int(os.environ.get('AUTH_VERIFY_WORKERS') or 2)
+    AUTH_VERIFY_MAX_PENDING = int(os.environ.get('AUTH_VERIFY_MAX_PENDING') or 32)
+    AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL') or 300)
+    
+    # Instrumentation: /metrics endpoint, and per-request sampling profiles
+    # (send "X-Profile: 1") written as folded stacks to PROFILE_DIR
+    METRICS_ENABLED = (os.environ.get('METRICS_ENABLED') or 'true').lower() == 'true'
+    PROFILING_ENABLED = (os.environ.get('PROFILING_ENABLED') or 'false').lower() == 'true'
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or 'profiles'
+    PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL') or 0.001)
     
     # Security settings
     SESSION_COOKIE_SECURE = True
@@ -1,19 +1,68 @@
 import json
+import uuid
 import bcrypt
 import jwt
 from datetime import datetime, timedelta
 from config import Config
 
+def to_cents(amount):
+    """Convert a currency amount to integer cents"""
+    return int(round(float(amount) * 100))
+
+def _parse_timestamp(value):
+    """Turn a stored ISO string into a datetime, leaving None/datetime alone"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+def _format_timestamp(value):
+    """Render a timestamp for storage, reusing the stored string if never parsed"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
 class User:
-    def __init__(self, name, account_number, balance, auth_code):
+    # Slots keep a resident account to a handful of pointers. Timestamps are
+    # kept as the ISO strings they were loaded from until first accessed.
+    __slots__ = ('name', 'account_number', 'balance_cents', 'auth_code_hash',
+                 '_created_at', '_last_login', 'is_active')
+
+    def __init__(self, name, account_number, balance, auth_code, auth_code_hash=None):
         self.name = name
         self.account_number = account_number
-        self.balance = float(balance)
-        self.auth_code_hash = self._hash_auth_code(auth_code)
-        self.created_at = datetime.utcnow()
-        self.last_login = None
+        self.balance_cents = to_cents(balance)
+        # Loading a stored user passes the existing hash, so no bcrypt round runs
+        self.auth_code_hash = auth_code_hash if auth_code_hash is not None else self._hash_auth_code(auth_code)
+        self._created_at = datetime.utcnow()
+        self._last_login = None
         self.is_active = True
 
+    @property
+    def balance(self):
+        return self.balance_cents / 100
+
+    @balance.setter
+    def balance(self, value):
+        self.balance_cents = to_cents(value)
+
+    @property
+    def created_at(self):
+        self._created_at = _parse_timestamp(self._created_at)
+        return self._created_at
+
+    @created_at.setter
+    def created_at(self, value):
+        self._created_at = value
+
+    @property
+    def last_login(self):
+        self._last_login = _parse_timestamp(self._last_login)
+        return self._last_login
+
+    @last_login.setter
+    def last_login(self, value):
+        self._last_login = value
+
     def _hash_auth_code(self, auth_code):
         """Hash the authentication code for secure storage"""
         return bcrypt.hashpw(auth_code.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -28,38 +77,45 @@ class User:
             'user_id': self.account_number,
             'name': self.name,
             'exp': datetime.utcnow() + timedelta(seconds=Config.JWT_EXPIRATION_DELTA),
-            'iat': datetime.utcnow()
+            'iat': datetime.utcnow(),
+            'jti': uuid.uuid4().hex
         }
         return jwt.encode(payload, Config.SECRET_KEY, algorithm='HS256')
 
     def update_balance(self, amount):
         """Update user balance with validation"""
-        if self.balance + amount < 0:
+        cents = to_cents(amount)
+        if self.balance_cents + cents < 0:
             raise ValueError("Insufficient funds")
-        self.balance += amount
+        self.balance_cents += cents
 
     def to_dict(self):
         """Convert user object to dictionary"""
+        # Timestamps that were never touched are emitted as loaded, unparsed
         return {
             'name': self.name,
             'account_number': self.account_number,
-            'balance': self.balance,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None,
+            'balance': self.balance_cents / 100,
+            'created_at': _format_timestamp(self._created_at),
+            'last_login': _format_timestamp(self._last_login),
             'is_active': self.is_active
         }
 
+    def to_record(self):
+        """Convert user object to its storage form, including the auth hash"""
+        record = self.to_dict()
+        record['auth_code_hash'] = self.auth_code_hash
+        return record
+
     @classmethod
     def from_dict(cls, data):
-        """Create user object from dictionary"""
-        user = cls(
-            data['name'],
-            data['account_number'],
-            data['balance'],
-            ''  # Empty auth code since we store the hash
-        )
+        """Create user object from dictionary without parsing timestamps"""
+        user = cls.__new__(cls)
+        user.name = data['name']
+        user.account_number = data['account_number']
+        user.balance_cents = to_cents(data['balance'])
         user.auth_code_hash = data.get('auth_code_hash', '')
-        user.created_at = datetime.fromisoformat(data['created_at']) if data.get('created_at') else datetime.utcnow()
-        user.last_login = datetime.fromisoformat(data['last_login']) if data.get('last_login') else None
+        user._created_at = data.get('created_at') or datetime.utcnow()
+        user._last_login = data.get('last_login') or None
         user.is_active = data.get('is_active', True)
-        return user
\ No newline at end of file
+        return user
@@ -0,0 +1,361 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from models.user import User, to_cents
+from services.journal import TransactionJournal
+from services.storage import StorageBackend, plan_transfers
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def _digest(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+def _parse(raw: bytes) -> List[Dict[str, Any]]:
+    return json.loads(raw) if raw.strip() else []
+
+def _record_accounts(record: Dict[str, Any]) -> Iterable[str]:
+    """Account numbers a journal record writes to"""
+    op = record.get('op')
+    if op == 'transfer':
+        return record['balances']
+    if op == 'login':
+        return (record['account'],)
+    if op == 'update':
+        return (record['user']['account_number'],)
+    return ()
+
+class AccountStore(StorageBackend):
+    """JSON file storage: a resident copy of the users file with hash indexes on account and name.
+
+    users.json is the snapshot; every mutation since the last snapshot lives
+    in an append-only journal next to it. Startup loads the snapshot and
+    replays the journal over it, and the snapshot is periodically rewritten
+    in the background so the journal stays short. The file is only
+    re-parsed when its mtime or size changes, so hand edits made by an
+    operator are still picked up on the next read.
+
+    Every snapshot written here gets an epoch marker in the journal holding
+    a digest of its contents, and a copy kept as users.base.json; only the
+    records after the marker for the current users.json are replayed. A
+    users.json whose digest has no marker was edited by hand. The edit is
+    diffed against the base copy: if none of the accounts it changed have
+    journal records since that snapshot, it is adopted and the journal is
+    replayed on top of it. Otherwise it is rejected with an error (the next
+    snapshot overwrites it), so a committed transaction is never lost.
+    """
+
+    def __init__(self, db_file: str, snapshot_every: int = 1000):
+        self.db_file = db_file
+        self.snapshot_every = snapshot_every
+        self.journal = TransactionJournal(os.path.splitext(db_file)[0] + '.journal')
+        self.base_file = os.path.splitext(db_file)[0] + '.base.json'
+        self._lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._journal_signature: Optional[Tuple[int, int]] = None
+        self._journal_offset = 0
+        self._pending_records = 0
+        self._compacting = False
+        self._users: List[User] = []
+        self._by_account: Dict[str, User] = {}
+        self._by_name: Dict[str, User] = {}
+        self._watchers: List[Callable[[Optional[Iterable[str]]], None]] = []
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        """Return (mtime_ns, size) of the users file, or None if it is missing"""
+        try:
+            stat = os.stat(self.db_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _read_bytes(path: str) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _read_file(self) -> Optional[Tuple[List[User], bytes]]:
+        """Parse the users file into User objects, or None if it isn't valid JSON"""
+        raw = self._read_bytes(self.db_file) or b''
+        try:
+            data = _parse(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            # Most likely caught mid-write by a hand edit
+            return None
+        return [User.from_dict(user_data) for user_data in data], raw
+
+    @staticmethod
+    def _write_durably(path: str, raw: bytes):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _rebuild_indexes(self, users: List[User]):
+        """Replace the resident users and both lookup indexes"""
+        by_account = {}
+        by_name = {}
+        for user in users:
+            by_account[user.account_number] = user
+            # Keep the first match so lookups behave like the old linear scan
+            by_name.setdefault(user.name.lower(), user)
+        self._users = users
+        self._by_account = by_account
+        self._by_name = by_name
+
+    def watch(self, callback: Callable[[Optional[Iterable[str]]], None]) -> bool:
+        self._watchers.append(callback)
+        return True
+
+    def _notify(self, account_numbers: Optional[Iterable[str]]):
+        for callback in self._watchers:
+            callback(account_numbers)
+
+    def _apply(self, record: Dict[str, Any]):
+        """Apply one journal record to the resident users"""
+        op = record.get('op')
+        if op == 'transfer':
+            for account_number, balance in record['balances'].items():
+                user = self._by_account.get(account_number)
+                if user:
+                    user.balance_cents = to_cents(balance)
+            self._notify(record['balances'])
+        elif op == 'login':
+            user = self._by_account.get(record['account'])
+            if user:
+                user.last_login = record['last_login']
+            self._notify((record['account'],))
+        elif op == 'epoch':
+            return
+        elif op == 'update':
+            updated_user = User.from_dict(record['user'])
+            current = self._by_account.get(updated_user.account_number)
+            if current is not None:
+                users = [updated_user if user is current else user for user in self._users]
+                self._rebuild_indexes(users)
+            self._notify((updated_user.account_number,))
+
+    def _replay_journal(self):
+        """Apply journal records appended since the last replay"""
+        records, self._journal_offset = self.journal.read_from(self._journal_offset)
+        for record in records:
+            self._apply(record)
+            self._pending_records += record.get('op') != 'epoch'
+        self._journal_signature = self.journal.signature()
+
+    def refresh(self):
+        """Reload the snapshot and/or journal if they changed on disk"""
+        signature = self._file_signature()
+        journal_signature = self.journal.signature()
+        if signature == self._signature and journal_signature == self._journal_signature:
+            return
+        with self._lock:
+            signature = self._file_signature()
+            journal_signature = self.journal.signature()
+            is_tail = self._is_journal_tail(journal_signature)
+            if signature != self._signature or not is_tail:
+                with metrics.span('store.reload'):
+                    loaded = self._read_file()
+                if loaded is None:
+                    # Keep serving the last good state until the file parses again
+                    if is_tail:
+                        self._replay_journal()
+                    return
+                users, offset = self._resolve_epoch(*loaded)
+                self._rebuild_indexes(users)
+                self._notify(None)
+                self._signature = signature
+                self._journal_offset = offset
+                self._pending_records = 0
+            self._replay_journal()
+
+    def _resolve_epoch(self, users: List[User], raw: bytes) -> Tuple[List[User], int]:
+        """Users to start from for this users file, and the journal offset to replay from"""
+        digest = _digest(raw)
+        epochs = self.journal.epochs()
+        for snapshot, offset in reversed(epochs):
+            if snapshot == digest:
+                return users, offset
+        if not epochs:
+            # A journal from before epoch markers belongs to this file
+            self._write_durably(self.base_file, raw)
+            self.journal.insert_epoch(0, digest)
+            return users, 0
+
+        base_digest, base_offset = epochs[-1]
+        records, _ = self.journal.read_from(base_offset)
+        journaled = {account for record in records for account in _record_accounts(record)}
+        base_raw = self._read_bytes(self.base_file)
+        if base_raw is None or _digest(base_raw) != base_digest:
+            logger.error('%s was edited by hand and there is no base copy to compare it with; '
+                         'replaying all %d journal records on top of the edit', self.db_file, len(records))
+            return users, base_offset
+
+        base = {record['account_number']: record for record in _parse(base_raw)}
+        edited = {record['account_number']: record for record in _parse(raw)}
+        touched = {account for account in base.keys() | edited.keys() if base.get(account) != edited.get(account)}
+        conflicts = touched & journaled
+        if conflicts:
+            logger.error('%s was edited by hand, but accounts %s have transactions not yet in it; '
+                         'ignoring the edit (the next snapshot overwrites it). Re-apply it after that.',
+                         self.db_file, ', '.join(sorted(conflicts)))
+            return [User.from_dict(record) for record in base.values()], base_offset
+
+        logger.warning('%s was edited by hand (accounts %s); replaying %d journal records on top of it',
+                       self.db_file, ', '.join(sorted(touched)), len(records))
+        self._write_durably(self.base_file, raw)
+        self.journal.insert_epoch(base_offset, digest)
+        return users, next(offset for snapshot, offset in reversed(self.journal.epochs()) if snapshot == digest)
+
+    def _is_journal_tail(self, journal_signature: Optional[Tuple[int, int]]) -> bool:
+        """True if the journal only grew since we last read it"""
+        if self._journal_signature is None or journal_signature is None:
+            return journal_signature == self._journal_signature
+        return (journal_signature[0] == self._journal_signature[0] and
+                journal_signature[1] >= self._journal_offset)
+
+    def users(self) -> List[User]:
+        """Return all resident users"""
+        self.refresh()
+        return list(self._users)
+
+    def get_by_account(self, account_number: str) -> Optional[User]:
+        """O(1) lookup by account number"""
+        self.refresh()
+        return self._by_account.get(account_number)
+
+    def get_by_name(self, name: str) -> Optional[User]:
+        """O(1) case-insensitive lookup by name"""
+        self.refresh()
+        return self._by_name.get(name.lower())
+
+    def record_login(self, account_number: str, when: datetime):
+        self.commit({
+            'op': 'login',
+            'account': account_number,
+            'last_login': when.isoformat()
+        })
+
+    def update_user(self, updated_user: User) -> bool:
+        if not self.get_by_account(updated_user.account_number):
+            return False
+        self.commit({
+            'op': 'update',
+            'user': updated_user.to_record(),
+            'ts': datetime.utcnow().isoformat()
+        })
+        return True
+
+    def transfer(self, from_account: str, to_account: str, amount: float) -> Tuple[bool, str]:
+        from_user = self.get_by_account(from_account)
+        to_user = self.get_by_account(to_account)
+        if from_user is to_user:
+            to_user = None
+        cents = to_cents(amount)
+
+        if not from_user:
+            return False, "Source account not found"
+        if not to_user:
+            return False, "Destination account not found"
+        if from_user.balance_cents < cents:
+            return False, "Insufficient funds"
+        if cents <= 0:
+            return False, "Invalid amount"
+
+        # Journal resulting balances, not deltas, so replay is idempotent
+        self.commit({
+            'op': 'transfer',
+            'from': from_account,
+            'to': to_account,
+            'amount': amount,
+            'balances': {
+                from_account: (from_user.balance_cents - cents) / 100,
+                to_account: (to_user.balance_cents + cents) / 100
+            },
+            'ts': datetime.utcnow().isoformat()
+        })
+        return True, "Transfer successful"
+
+    def transfer_many(self, legs: Sequence[Tuple[str, str, float]], atomic: bool = True) -> List[Tuple[bool, str]]:
+        balances = {}
+        cent_legs = []
+        for from_account, to_account, amount in legs:
+            cent_legs.append((from_account, to_account, to_cents(amount)))
+            for account_number in (from_account, to_account):
+                user = self.get_by_account(account_number)
+                if user:
+                    balances[account_number] = user.balance_cents
+
+        results, changed = plan_transfers(balances, cent_legs, atomic)
+        if changed:
+            # The whole batch is a single journal record
+            self.commit({
+                'op': 'transfer',
+                'legs': sum(ok for ok, _ in results),
+                'balances': {account_number: cents / 100 for account_number, cents in changed.items()},
+                'ts': datetime.utcnow().isoformat()
+            })
+        return results
+
+    def export(self):
+        self.snapshot()
+
+    def commit(self, record: Dict[str, Any]):
+        """Durably journal a mutation, then apply it to the resident users"""
+        with self._lock:
+            self.refresh()
+            with metrics.span('store.journal_append'):
+                self.journal.append(record)
+            self._replay_journal()
+            if self._pending_records >= self.snapshot_every and not self._compacting:
+                self._compacting = True
+                threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.snapshot()
+        finally:
+            self._compacting = False
+
+    @metrics.timed('store.snapshot')
+    def snapshot(self):
+        """Write the resident users to users.json and trim the journal"""
+        with self._snapshot_lock:
+            with self._lock:
+                self.refresh()
+                if self._file_signature() != self._signature:
+                    # users.json is being edited and doesn't parse yet
+                    return
+                data = [user.to_record() for user in self._users]
+                offset = self._journal_offset
+
+            # Write outside the store lock so readers and writers are not blocked
+            raw = json.dumps(data, indent=2).encode('utf-8')
+            tmp_path = self.db_file + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+            self._write_durably(self.base_file, raw)
+
+            with self._lock:
+                # Mark where this snapshot's records start before it becomes
+                # users.json, so no reader mistakes it for a hand edit
+                self.journal.insert_epoch(offset, _digest(raw))
+                os.replace(tmp_path, self.db_file)
+                self.journal.discard_before(offset)
+                self._signature = self._file_signature()
+                self._pending_records = 0
+                self._journal_offset = 0
+                self._journal_signature = None
+                self._replay_journal()
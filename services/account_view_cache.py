@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+class AccountViewCache:
+    """Read-through cache of per-account response views, invalidated on write.
+
+    Every account has a version counter that the storage layer bumps
+    whenever the account changes. A view is only stored if the version
+    it was built under is still current when the build finishes, so a
+    write racing with a rebuild can never leave a stale view behind, and
+    the first read after a confirmed transfer always rebuilds. Views are
+    shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._epoch = 0
+        self._versions: Dict[str, int] = {}
+        self._views: 'OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _version(self, account_number: str) -> Tuple[int, int]:
+        return self._epoch, self._versions.get(account_number, 0)
+
+    def get(self, account_number: str, build: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Return the cached view, or build it (outside the lock) and cache it"""
+        with self._lock:
+            version = self._version(account_number)
+            entry = self._views.get(account_number)
+            if entry is not None and entry[0] == version:
+                self._views.move_to_end(account_number)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        view = build()
+        if view is None:
+            return None
+        with self._lock:
+            if self._version(account_number) == version:
+                self._views[account_number] = (version, view)
+                self._views.move_to_end(account_number)
+                while len(self._views) > self.max_entries:
+                    self._views.popitem(last=False)
+        return view
+
+    def invalidate(self, account_numbers: Optional[Iterable[str]] = None):
+        """Bump the given accounts' versions, or every account's if None"""
+        with self._lock:
+            if account_numbers is None:
+                self._epoch += 1
+                self._versions.clear()
+                self._views.clear()
+                return
+            for account_number in account_numbers:
+                self._versions[account_number] = self._versions.get(account_number, 0) + 1
+                self._views.pop(account_number, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._views)}
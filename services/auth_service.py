@@ -1,13 +1,159 @@
+import hashlib
 import jwt
+import math
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from functools import wraps
+from typing import Any, Dict, Optional
 from flask import request, jsonify, session
 from config import Config
+from services.metrics import metrics
+from services.redis_pool import get_redis
+
+class TokenCache:
+    """Bounded LRU of already-verified JWT payloads.
+
+    Keyed by a SHA-256 digest of the whole token, so a token whose payload
+    was altered can never hit another token's entry. Entries are dropped
+    once the token's own exp has passed.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[bytes, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._data.get(key)
+            if payload is not None and payload.get('exp', 0) <= time.time():
+                del self._data[key]
+                payload = None
+            if payload is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def set(self, key: bytes, payload: Dict[str, Any]):
+        with self._lock:
+            self._data[key] = payload
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard(self, key: bytes):
+        with self._lock:
+            self._data.pop(key, None)
+
+class RevocationList:
+    """Token ids invalidated before their expiry, forgotten once expired.
+
+    With a redis_url the list is shared as a sorted set of token ids scored
+    by expiry, so a logout handled by one worker revokes the token on all of
+    them. Lookups never wait on Redis: they read a local mirror that one
+    caller re-reads at most every poll_interval seconds, which is how long a
+    revocation made elsewhere can take to apply here. While Redis is
+    unreachable the last mirror is kept, polls back off up to MAX_BACKOFF,
+    and revocations this process made still apply.
+    """
+
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, redis_url: Optional[str] = None, key: str = 'revoked',
+                 poll_interval: float = 1.0):
+        self.redis_url = redis_url
+        self.key = key
+        self.poll_interval = poll_interval
+        self.errors = 0
+        self._revoked: Dict[str, float] = {}
+        self._shared: Dict[str, float] = {}
+        self._next_poll = 0.0
+        self._failed_polls = 0
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+
+    def revoke(self, token_id: str, expires_at: float):
+        with self._lock:
+            now = time.time()
+            for expired in [k for k, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[expired]
+            self._revoked[token_id] = expires_at
+        if self.redis_url:
+            try:
+                get_redis(self.redis_url).zadd(self.key, {token_id: expires_at})
+            except Exception:
+                self.errors += 1
+
+    def _poll(self):
+        # Other callers keep using the current mirror while one polls
+        if time.monotonic() < self._next_poll or not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            client = get_redis(self.redis_url)
+            client.zremrangebyscore(self.key, '-inf', time.time())
+            self._shared = {
+                (token_id.decode('utf-8') if isinstance(token_id, bytes) else token_id): expires_at
+                for token_id, expires_at in client.zrange(self.key, 0, -1, withscores=True)
+            }
+            self._failed_polls = 0
+            self._next_poll = time.monotonic() + self.poll_interval
+        except Exception:
+            self.errors += 1
+            self._failed_polls += 1
+            self._next_poll = time.monotonic() + min(self.poll_interval * 2 ** self._failed_polls,
+                                                     self.MAX_BACKOFF)
+        finally:
+            self._poll_lock.release()
+
+    def __contains__(self, token_id: str) -> bool:
+        if token_id in self._revoked:
+            return True
+        if not self.redis_url:
+            return False
+        self._poll()
+        return token_id in self._shared
+
+def _token_id(payload: Dict[str, Any], key: bytes) -> str:
+    # Tokens issued before jti was added are revoked by digest instead
+    return payload.get('jti') or key.hex()
 
 class AuthService:
+    token_cache = TokenCache(Config.TOKEN_CACHE_SIZE)
+    revoked = RevocationList(Config.REDIS_URL, poll_interval=Config.REVOCATION_POLL_SECONDS)
+
     @staticmethod
+    @metrics.timed('auth.verify_token')
     def verify_token(token):
-        """Verify JWT token"""
+        """Verify JWT token, skipping the full decode for recently seen tokens.
+
+        Cached or not, a token is checked against the (possibly shared)
+        revocation list before it is accepted.
+        """
+        key = TokenCache.key(token)
+        payload = AuthService.token_cache.get(key)
+        if payload is None:
+            payload = AuthService._decode(token)
+            if payload is None:
+                return None
+            AuthService.token_cache.set(key, payload)
+        if _token_id(payload, key) in AuthService.revoked:
+            # Revoked by another worker: stop serving it from this cache too
+            AuthService.token_cache.discard(key)
+            return None
+        return payload
+
+    @staticmethod
+    def _decode(token):
         try:
             payload = jwt.decode(token, Config.SECRET_KEY, algorithms=['HS256'])
             return payload
@@ -16,16 +162,31 @@ class AuthService:
         except jwt.InvalidTokenError:
             return None
 
+    @staticmethod
+    def revoke_token(token):
+        """Invalidate a token server-side until it would have expired"""
+        payload = AuthService.verify_token(token)
+        if not payload:
+            return False
+        key = TokenCache.key(token)
+        AuthService.revoked.revoke(_token_id(payload, key), payload.get('exp', time.time()))
+        AuthService.token_cache.discard(key)
+        return True
+
+    @staticmethod
+    def get_request_token():
+        """Read the bearer token from the Authorization header or the session"""
+        token = request.headers.get('Authorization')
+        if token and token.startswith('Bearer '):
+            return token.split(' ')[1]
+        return session.get('token')
+
     @staticmethod
     def token_required(f):
         """Decorator to require valid token"""
         @wraps(f)
         def decorated(*args, **kwargs):
-            token = request.headers.get('Authorization')
-            if token and token.startswith('Bearer '):
-                token = token.split(' ')[1]
-            else:
-                token = session.get('token')
+            token = AuthService.get_request_token()
             
             if not token:
                 return jsonify({'error': 'Token is missing'}), 401
@@ -42,4 +203,4 @@ class AuthService:
     @staticmethod
     def get_current_user():
         """Get current authenticated user from request"""
-        return getattr(request, 'current_user', None)
\ No newline at end of file
+        return getattr(request, 'current_user', None)
@@ -1,11 +1,94 @@
-from openai import OpenAI
-from typing import Dict, Any
+from contextlib import closing
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import re
 from config import Config
+from services.circuit_breaker import CircuitBreaker
+from services.llm_client import LLMClient
+from services.request_coalescer import RequestCoalescer
+from services.metrics import metrics
+from services.intent_cache import IntentCache, name_pattern
+from services.intent_classifier import RuleClassifier
+from services.conversation_store import ConversationStore, refers_back
+
+class IntentStreamParser:
+    """Recognizes the response grammar incrementally from streamed tokens.
+
+    feed() returns ("intent", name) as soon as a line starts with one of
+    the grammar prefixes, and for CHAT| lines then returns ("token", text)
+    for each new piece of the reply until the line ends. Lines are matched
+    in the same order _parse_response would match them.
+    """
+
+    PREFIXES = (
+        ('TRANSFER|', 'TRANSFER_MONEY'),
+        ('BALANCE|', 'GET_BALANCE'),
+        ('INFO', 'ACCOUNT_INFO'),
+        ('CHAT|', 'CHITCHAT'),
+    )
+
+    def __init__(self):
+        self.text = ''
+        self.intent = None
+        self._line_start = 0
+        self._chat_pos = None
+        self._chat_closed = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        self.text += chunk
+        events = []
+
+        while self.intent is None:
+            line_end = self.text.find('\n', self._line_start)
+            raw = self.text[self._line_start:] if line_end == -1 else self.text[self._line_start:line_end]
+            line = raw.lstrip()
+            for prefix, intent in self.PREFIXES:
+                if line.startswith(prefix):
+                    self.intent = intent
+                    events.append(('intent', intent))
+                    if intent == 'CHITCHAT':
+                        self._chat_pos = self._line_start + (len(raw) - len(line)) + len(prefix)
+                    break
+            if self.intent is not None or line_end == -1:
+                break
+            self._line_start = line_end + 1
+
+        if self._chat_pos is not None and not self._chat_closed:
+            end = self.text.find('\n', self._chat_pos)
+            piece = self.text[self._chat_pos:] if end == -1 else self.text[self._chat_pos:end]
+            if piece:
+                events.append(('token', piece))
+                self._chat_pos += len(piece)
+            if end != -1:
+                self._chat_closed = True
+        return events
 
 class ChatbotService:
+    COMPLETION_ARGS = {"model": "gpt-3.5-turbo", "temperature": 0.3, "max_tokens": 200}
+
     def __init__(self):
-        self.client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.llm = LLMClient(
+            api_key=Config.OPENAI_API_KEY,
+            base_url=Config.OPENAI_BASE_URL,
+            timeout=Config.OPENAI_TIMEOUT,
+            max_retries=Config.OPENAI_MAX_RETRIES,
+            max_concurrency=Config.LLM_MAX_CONCURRENCY,
+            pool_size=Config.LLM_POOL_SIZE,
+            breaker=CircuitBreaker(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_RESET)
+        )
+        self.cache = IntentCache(
+            max_entries=Config.INTENT_CACHE_SIZE,
+            ttl=Config.INTENT_CACHE_TTL,
+            backend=Config.INTENT_CACHE_BACKEND,
+            redis_url=Config.REDIS_URL
+        )
+        self.classifier = RuleClassifier(threshold=Config.LOCAL_INTENT_THRESHOLD)
+        self.conversations = ConversationStore(
+            max_turns=Config.CONVERSATION_MAX_TURNS,
+            token_budget=Config.CONVERSATION_TOKEN_BUDGET,
+            summary_tokens=Config.CONVERSATION_SUMMARY_TOKENS,
+            max_conversations=Config.CONVERSATION_MAX_SESSIONS,
+            ttl=Config.CONVERSATION_TTL
+        )
         self.system_prompt = """
         You are a professional banking assistant. Analyze user queries and respond with:
         
@@ -25,29 +108,132 @@ class ChatbotService:
         
         Always be professional, secure, and helpful.
         """
+        self.coalescer = None
+        if Config.LLM_BATCH_WINDOW_MS > 0:
+            self.coalescer = RequestCoalescer(
+                self.llm,
+                self.system_prompt,
+                self.COMPLETION_ARGS,
+                window=Config.LLM_BATCH_WINDOW_MS / 1000,
+                max_batch=Config.LLM_BATCH_MAX_SIZE
+            )
+
+    def _messages(self, user_input: str, user_name: str,
+                  history: List[Dict[str, str]] = ()) -> List[Dict[str, str]]:
+        # The system prompt always leads unchanged, so providers can reuse
+        # its cached prefix; per-conversation context goes after it
+        return [
+            {"role": "system", "content": self.system_prompt},
+            *history,
+            {"role": "user", "content": f"User: {user_name}\nQuery: {user_input}"}
+        ]
+
+    def _context(self, user_input: str, conversation_id: Optional[str]) -> List[Dict[str, str]]:
+        """Earlier turns to send along, only for queries that refer back to them"""
+        if conversation_id is None or not refers_back(user_input):
+            return []
+        return self.conversations.history(conversation_id)
+
+    def _completion(self, user_input: str, user_name: str, history: List[Dict[str, str]] = ()):
+        """Coroutine producing the raw LLM reply, to run on the LLM loop"""
+        # Batched prompts carry no history, so follow-ups go out on their own
+        if self.coalescer is not None and not history:
+            return self._classify_batched(user_input, user_name)
+        return self.llm.complete_in_loop(self._messages(user_input, user_name, history), **self.COMPLETION_ARGS)
+
+    async def _classify_batched(self, user_input: str, user_name: str) -> str:
+        # A batch shares one prompt between customers, so the name stays
+        # here and only goes back into this caller's own reply
+        if user_name:
+            user_input = name_pattern(user_name).sub('{user}', user_input)
+        reply = await self.coalescer.classify(f"Query: {user_input}")
+        return reply.replace('{user}', user_name) if user_name else reply
+
+    def _answer_locally(self, user_input: str, user_name: str,
+                        history: List[Dict[str, str]] = ()) -> Optional[Dict[str, Any]]:
+        """Answer from the rule classifier or the intent cache, if possible"""
+        # Confident rule matches never leave the process
+        line = self.classifier.try_classify(user_input)
+        if line is not None:
+            return self._parse_response(line)
+        # A follow-up's meaning depends on its conversation, not just its text
+        if history:
+            return None
+        return self.cache.get(user_input, user_name)
+
+    def _finish(self, user_input: str, user_name: str, response: str,
+                history: List[Dict[str, str]] = ()) -> Dict[str, Any]:
+        parsed = self._parse_response(response)
+        if not history:
+            self.cache.put(user_input, user_name, parsed)
+        return parsed
 
-    def process_query(self, user_input: str, user_name: str) -> Dict[str, Any]:
+    def _remember(self, conversation_id: Optional[str], user_input: str, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the exchange in the conversation, as a grammar line"""
+        if conversation_id is not None and parsed.get('intent') != 'ERROR':
+            self.conversations.record(conversation_id, user_input, self._format_line(parsed))
+        return parsed
+
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        return {
+            "intent": "ERROR",
+            "message": "I'm having trouble processing your request. Please try again.",
+            "error": str(error)
+        }
+
+    @metrics.timed('chatbot.process_query')
+    def process_query(self, user_input: str, user_name: str,
+                      conversation_id: Optional[str] = None) -> Dict[str, Any]:
         """Process user query and return structured response"""
+        history = self._context(user_input, conversation_id)
+        local = self._answer_locally(user_input, user_name, history)
+        if local is not None:
+            return self._remember(conversation_id, user_input, local)
+
         try:
-            completion = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": f"User: {user_name}\nQuery: {user_input}"}
-                ],
-                temperature=0.3,
-                max_tokens=200
-            )
-            
-            response = completion.choices[0].message.content.strip()
-            return self._parse_response(response)
-            
+            response = self.llm.submit(self._completion(user_input, user_name, history)).result()
+            return self._remember(conversation_id, user_input,
+                                  self._finish(user_input, user_name, response, history))
         except Exception as e:
-            return {
-                "intent": "ERROR",
-                "message": "I'm having trouble processing your request. Please try again.",
-                "error": str(e)
-            }
+            return self._error_response(e)
+
+    def stream_query(self, user_input: str, user_name: str,
+                     conversation_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield ("intent", ...), then ("token", ...) pieces, then ("done", response).
+
+        The intent is reported as soon as its prefix has streamed in; for
+        CHITCHAT the reply text follows token by token.
+        """
+        history = self._context(user_input, conversation_id)
+        local = self._answer_locally(user_input, user_name, history)
+        if local is not None:
+            self._remember(conversation_id, user_input, local)
+            yield 'intent', {'intent': local['intent']}
+            if local['intent'] == 'CHITCHAT':
+                yield 'token', {'text': local.get('message', '')}
+            yield 'done', local
+            return
+
+        parser = IntentStreamParser()
+        try:
+            # Closing the stream early (client disconnect) cancels the
+            # upstream request without counting against the breaker
+            with closing(self.llm.stream(self._messages(user_input, user_name, history),
+                                         **self.COMPLETION_ARGS)) as deltas:
+                for delta in deltas:
+                    for event, value in parser.feed(delta):
+                        if event == 'intent':
+                            yield 'intent', {'intent': value}
+                        else:
+                            yield 'token', {'text': value}
+            result = self._remember(conversation_id, user_input,
+                                    self._finish(user_input, user_name, parser.text.strip(), history))
+        except Exception as e:
+            result = self._error_response(e)
+
+        if parser.intent is None:
+            yield 'intent', {'intent': result['intent']}
+        yield 'done', result
 
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """Parse the AI response into structured data"""
@@ -91,6 +277,17 @@ class ChatbotService:
             "message": "I'm here to help with your banking needs. You can check balances, transfer money, or ask general questions."
         }
 
+    def _format_line(self, parsed: Dict[str, Any]) -> str:
+        """Render a parsed intent back into the response grammar"""
+        intent = parsed.get('intent')
+        if intent == 'TRANSFER_MONEY':
+            return f"TRANSFER|{parsed.get('account_number')}|{parsed.get('amount', 0):g}"
+        if intent == 'GET_BALANCE':
+            return f"BALANCE|{parsed.get('account_number') or ''}"
+        if intent == 'ACCOUNT_INFO':
+            return "INFO"
+        return f"CHAT|{parsed.get('message', '')}"
+
     def _extract_amount(self, amount_str: str) -> float:
         """Extract numeric amount from string"""
         # Remove currency symbols and extract numbers
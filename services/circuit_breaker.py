@@ -0,0 +1,68 @@
+import threading
+import time
+
+class CircuitOpen(Exception):
+    """Raised when a call is refused because the breaker is open"""
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for a while.
+
+    After failure_threshold consecutive failures the breaker opens and
+    every call is refused for reset_timeout seconds. The first call after
+    that is let through as a probe: success closes the breaker, failure
+    opens it again. A probe that hasn't reported back within reset_timeout
+    is given up on and the next call probes instead. Calls the caller
+    abandons say nothing about the upstream and are released, not counted.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raise CircuitOpen unless a call may go through now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpen("Upstream unavailable, circuit open")
+                self.state = self.HALF_OPEN
+                self.probe_started_at = time.monotonic()
+            elif self.state == self.HALF_OPEN:
+                # Only one probe at a time
+                if time.monotonic() - self.probe_started_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpen("Upstream unavailable, probe in progress")
+                self.probe_started_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Report a call that was abandoned by its caller rather than failed.
+
+        Counts as neither success nor failure; an abandoned probe frees the
+        slot so the next call probes straight away.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probe_started_at = time.monotonic() - self.reset_timeout
@@ -0,0 +1,108 @@
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Tuple
+
+# Words that only make sense given earlier turns ("send the same to 7")
+REFERENCE_PATTERN = re.compile(
+    r'\b(?:same|that|those|it|them|again|previous|last|before|too|also|another|more|instead|there)\b'
+)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+def refers_back(user_input: str) -> bool:
+    """True if the query leans on earlier turns to be understood"""
+    return bool(REFERENCE_PATTERN.search(user_input.lower()))
+
+class Conversation:
+    __slots__ = ('turns', 'summary', 'touched_at')
+
+    def __init__(self, max_turns: int):
+        # (user text, assistant grammar line), oldest first
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=max_turns)
+        self.summary: Deque[str] = deque()
+        self.touched_at = time.monotonic()
+
+class ConversationStore:
+    """Recent turns per conversation, sized to a prompt token budget.
+
+    Each conversation keeps its last max_turns exchanges verbatim. A turn
+    pushed out of that ring is folded into a one-line summary entry, and
+    the summary itself drops its oldest entries beyond summary_tokens.
+    history() returns as much of summary + turns as fits token_budget,
+    newest turns first to survive. Conversations idle for ttl seconds or
+    beyond max_conversations (least recently used) are forgotten.
+    """
+
+    def __init__(self, max_turns: int = 6, token_budget: int = 600, summary_tokens: int = 150,
+                 max_conversations: int = 10000, ttl: float = 1800):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._conversations: 'OrderedDict[str, Conversation]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str, create: bool = False):
+        conversation = self._conversations.get(key)
+        if conversation is not None and conversation.touched_at + self.ttl < time.monotonic():
+            del self._conversations[key]
+            conversation = None
+        if conversation is None and create:
+            conversation = self._conversations[key] = Conversation(self.max_turns)
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+        if conversation is not None:
+            conversation.touched_at = time.monotonic()
+            self._conversations.move_to_end(key)
+        return conversation
+
+    def record(self, key: str, user_input: str, reply_line: str):
+        """Append one exchange, summarizing whatever falls out of the ring"""
+        with self._lock:
+            conversation = self._get(key, create=True)
+            if len(conversation.turns) == conversation.turns.maxlen:
+                old_input, old_line = conversation.turns[0]
+                conversation.summary.append(f'"{old_input}" -> {old_line}')
+                while (len(conversation.summary) > 1 and
+                       estimate_tokens('\n'.join(conversation.summary)) > self.summary_tokens):
+                    conversation.summary.popleft()
+            conversation.turns.append((user_input, reply_line))
+
+    def history(self, key: str) -> List[Dict[str, str]]:
+        """Chat messages for the conversation so far, within token_budget"""
+        with self._lock:
+            conversation = self._get(key)
+            if conversation is None:
+                return []
+            turns = list(conversation.turns)
+            summary = list(conversation.summary)
+
+        budget = self.token_budget
+        messages: List[Dict[str, str]] = []
+        for user_input, reply_line in reversed(turns):
+            cost = estimate_tokens(user_input) + estimate_tokens(reply_line)
+            if cost > budget:
+                break
+            budget -= cost
+            messages[:0] = [
+                {"role": "user", "content": user_input},
+                {"role": "assistant", "content": reply_line}
+            ]
+        else:
+            if summary:
+                text = "Earlier in this conversation (query -> reply):\n" + '\n'.join(summary)
+                if estimate_tokens(text) <= budget:
+                    messages.insert(0, {"role": "system", "content": text})
+        return messages
+
+    def clear(self, key: str):
+        with self._lock:
+            self._conversations.pop(key, None)
+
+    def __len__(self):
+        return len(self._conversations)
@@ -0,0 +1,127 @@
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+import bcrypt
+from services.metrics import metrics
+
+class VerifierBusy(Exception):
+    """Raised when too many credential checks are already queued"""
+
+def _checkpw(auth_code: str, auth_code_hash: str) -> bool:
+    """Run bcrypt in a worker process"""
+    try:
+        return bcrypt.checkpw(auth_code.encode('utf-8'), auth_code_hash.encode('utf-8'))
+    except ValueError:
+        # Empty or malformed stored hash
+        return False
+
+class CredentialVerifier:
+    """Checks auth codes off the request thread, with a short-lived cache.
+
+    bcrypt runs in a small process pool so a login burst can only occupy
+    those workers, never the threads serving chat and transfers. Once
+    max_pending checks are in flight, further logins are refused with
+    VerifierBusy instead of queueing without bound. Successful checks are
+    remembered for ttl seconds, keyed on the account, the stored hash and an
+    HMAC of the code under a per-process secret, so the plaintext code is
+    never kept in memory and changing the hash invalidates the entry.
+
+    Workers are started from a fork server (spawned where there is none):
+    forking the multi-threaded server could copy a lock another thread held
+    into the child. A worker that dies breaks its pool, which is replaced
+    and the check retried once.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 32, ttl: float = 300, max_entries: int = 10000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._secret = os.urandom(32)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._cache: 'OrderedDict[tuple, float]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Created lazily so forking servers start the pool in each worker
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context(method))
+        return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _check(self, auth_code: str, auth_code_hash: str) -> bool:
+        for attempt in range(2):
+            pool = self._executor()
+            try:
+                return pool.submit(_checkpw, auth_code, auth_code_hash).result()
+            except BrokenProcessPool:
+                # A worker was killed (e.g. by the OOM killer); a broken
+                # pool refuses every later submit, so start a new one
+                self._discard(pool)
+                if attempt:
+                    raise
+
+    def _cache_key(self, account_number: str, auth_code: str, auth_code_hash: str) -> tuple:
+        digest = hmac.new(self._secret, auth_code.encode('utf-8'), hashlib.sha256).digest()
+        return account_number, auth_code_hash, digest
+
+    def _cached(self, key: tuple) -> bool:
+        with self._cache_lock:
+            expires_at = self._cache.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return False
+            return True
+
+    def _remember(self, key: tuple):
+        with self._cache_lock:
+            self._cache[key] = time.monotonic() + self.ttl
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def verify(self, account_number: str, auth_code: str, auth_code_hash: str) -> bool:
+        """Check an auth code against its stored bcrypt hash"""
+        key = self._cache_key(account_number, auth_code, auth_code_hash)
+        if self._cached(key):
+            return True
+
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                raise VerifierBusy("Too many logins in progress")
+            self._pending += 1
+        try:
+            with metrics.span('auth.bcrypt'):
+                ok = self._check(auth_code, auth_code_hash)
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+        if ok:
+            self._remember(key)
+        return ok
+
+    def pending(self) -> int:
+        """Number of checks currently queued or running"""
+        return self._pending
@@ -1,97 +1,126 @@
 import json
 import os
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from models.user import User
+from services.storage import create_backend
+from services.lock_manager import StripedLockManager
+from services.credential_verifier import CredentialVerifier
+from services.account_view_cache import AccountViewCache
+from services.metrics import metrics
+from config import Config
 
 class DatabaseService:
-    def __init__(self, db_file='data/users.json'):
+    def __init__(self, db_file='data/users.json', database_url=None):
         self.db_file = db_file
         self._ensure_db_exists()
+        self.store = create_backend(database_url or Config.DATABASE_URL, db_file)
+        self.locks = StripedLockManager(Config.TRANSFER_LOCK_STRIPES)
+        self.verifier = CredentialVerifier(
+            workers=Config.AUTH_VERIFY_WORKERS,
+            max_pending=Config.AUTH_VERIFY_MAX_PENDING,
+            ttl=Config.AUTH_CACHE_TTL
+        )
+        # Only cache views when the backend reports every write, including
+        # other workers'; SQLite can be written behind our back
+        self.views = None
+        if Config.ACCOUNT_VIEW_CACHE_SIZE > 0:
+            views = AccountViewCache(Config.ACCOUNT_VIEW_CACHE_SIZE)
+            if self.store.watch(views.invalidate):
+                self.views = views
 
     def _ensure_db_exists(self):
         """Ensure database file and directory exist"""
         os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
         if not os.path.exists(self.db_file):
-            self._save_users([])
+            with open(self.db_file, 'w') as f:
+                json.dump([], f, indent=2)
 
+    @metrics.timed('db.load_users')
     def _load_users(self) -> List[User]:
-        """Load users from JSON file"""
-        try:
-            with open(self.db_file, 'r') as f:
-                data = json.load(f)
-                return [User.from_dict(user_data) for user_data in data]
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
-
-    def _save_users(self, users: List[User]):
-        """Save users to JSON file"""
-        with open(self.db_file, 'w') as f:
-            json.dump([user.to_dict() for user in users], f, indent=2)
+        """Return all users from the storage backend"""
+        return self.store.users()
 
+    @metrics.timed('db.save_users')
+    def _save_users(self):
+        """Flush the storage backend to its on-disk form"""
+        self.store.export()
+
+    @metrics.timed('db.get_user_by_account')
     def get_user_by_account(self, account_number: str) -> Optional[User]:
         """Get user by account number"""
-        users = self._load_users()
-        for user in users:
-            if user.account_number == account_number:
-                return user
-        return None
+        return self.store.get_by_account(account_number)
+
+    @metrics.timed('db.get_account_view')
+    def get_account_view(self, account_number: str) -> Optional[Dict[str, Any]]:
+        """Read-only response view of an account, cached until the account changes.
+
+        Holds 'summary' (name, account number, balance), 'details' (the
+        public to_dict() fields) and 'summary_json', the serialized summary.
+        """
+        if self.views is None:
+            return self._build_view(account_number)
+        self.store.refresh()
+        return self.views.get(account_number, lambda: self._build_view(account_number))
+
+    def _build_view(self, account_number: str) -> Optional[Dict[str, Any]]:
+        user = self.store.get_by_account(account_number)
+        if user is None:
+            return None
+        summary = {
+            'name': user.name,
+            'account_number': user.account_number,
+            'balance': user.balance
+        }
+        return {'summary': summary, 'details': user.to_dict(), 'summary_json': json.dumps(summary, sort_keys=True, separators=(',', ':'))}
 
+    @metrics.timed('db.get_user_by_name')
     def get_user_by_name(self, name: str) -> Optional[User]:
         """Get user by name"""
-        users = self._load_users()
-        for user in users:
-            if user.name.lower() == name.lower():
-                return user
-        return None
+        return self.store.get_by_name(name)
 
+    @metrics.timed('db.authenticate_user')
     def authenticate_user(self, name: str, account_number: str, auth_code: str) -> Optional[User]:
-        """Authenticate user with credentials"""
-        users = self._load_users()
-        for user in users:
-            if (user.name.lower() == name.lower() and 
-                user.account_number == account_number and 
-                user.verify_auth_code(auth_code) and 
-                user.is_active):
-                user.last_login = datetime.utcnow()
-                self._save_users(users)
-                return user
+        """Authenticate user with credentials.
+
+        Raises VerifierBusy when the bcrypt pool is saturated.
+        """
+        user = self.store.get_by_account(account_number)
+        if (user and
+            user.name.lower() == name.lower() and
+            user.is_active and
+            self.verifier.verify(user.account_number, auth_code, user.auth_code_hash)):
+            user.last_login = datetime.utcnow()
+            self.store.record_login(user.account_number, user.last_login)
+            return user
         return None
 
+    @metrics.timed('db.update_user')
     def update_user(self, updated_user: User):
         """Update user in database"""
-        users = self._load_users()
-        for i, user in enumerate(users):
-            if user.account_number == updated_user.account_number:
-                users[i] = updated_user
-                self._save_users(users)
-                return True
-        return False
+        with self.locks.acquire(updated_user.account_number):
+            return self.store.update_user(updated_user)
 
+    @metrics.timed('db.transfer_money')
     def transfer_money(self, from_account: str, to_account: str, amount: float) -> tuple[bool, str]:
         """Transfer money between accounts"""
-        users = self._load_users()
-        from_user = None
-        to_user = None
-        
-        for user in users:
-            if user.account_number == from_account:
-                from_user = user
-            elif user.account_number == to_account:
-                to_user = user
-        
-        if not from_user:
-            return False, "Source account not found"
-        if not to_user:
-            return False, "Destination account not found"
-        if from_user.balance < amount:
-            return False, "Insufficient funds"
-        if amount <= 0:
-            return False, "Invalid amount"
-        
-        try:
-            from_user.update_balance(-amount)
-            to_user.update_balance(amount)
-            self._save_users(users)
-            return True, "Transfer successful"
-        except ValueError as e:
-            return False, str(e)
\ No newline at end of file
+        # Validation and the write happen under both accounts' stripes, so
+        # two transfers can't both see the old balance and overwrite each other
+        with self.locks.acquire(from_account, to_account):
+            return self.store.transfer(from_account, to_account, amount)
+
+    @metrics.timed('db.transfer_many')
+    def transfer_many(self, legs: Sequence[Tuple[str, str, float]], atomic: bool = True) -> List[Tuple[bool, str]]:
+        """Apply a batch of (from, to, amount) transfers, persisting once.
+
+        Every leg is validated against one consistent snapshot while the
+        locks for all involved accounts are held. With atomic=True a single
+        bad leg rejects the batch; otherwise each leg gets its own status.
+        """
+        accounts = {account for leg in legs for account in leg[:2]}
+        with self.locks.acquire(*accounts):
+            return self.store.transfer_many(legs, atomic)
+
+    def lock_metrics(self) -> List[Dict[str, Any]]:
+        """Per-stripe wait and hold times for the transfer locks"""
+        return self.locks.metrics()
@@ -0,0 +1,212 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from services.redis_pool import get_redis
+
+NUMBER_PATTERN = re.compile(r'\$?\d[\d,]*(?:\.\d+)?')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+TRAILING_PUNCTUATION = '?!. '
+
+def normalize(text: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation"""
+    return WHITESPACE_PATTERN.sub(' ', text.lower()).strip(TRAILING_PUNCTUATION)
+
+def name_pattern(user_name: str) -> re.Pattern:
+    """Match the user's name as a whole word, in any case.
+
+    So "al" templates "hi al" but leaves "balance" and "always" alone.
+    """
+    return re.compile(rf'(?<!\w){re.escape(user_name)}(?!\w)', re.IGNORECASE)
+
+def templatize(text: str, user_name: str) -> Tuple[str, List[str]]:
+    """Replace user-specific slots with placeholders.
+
+    Numbers (account numbers, amounts) become {0}, {1}, ... in order of
+    appearance and the user's own name becomes {user}, so "send $50 to 7"
+    from any user maps to the same template "send {0} to {1}".
+    """
+    slots = []
+
+    def slot(match):
+        slots.append(match.group().lstrip('$').replace(',', ''))
+        return '{%d}' % (len(slots) - 1)
+
+    template = NUMBER_PATTERN.sub(slot, normalize(text))
+    if user_name:
+        template = name_pattern(user_name).sub('{user}', template)
+    return template, slots
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU whose entries expire after ttl seconds"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+class RedisTemplateStore:
+    """Shares templated intents between workers through Redis"""
+
+    def __init__(self, redis_url: str, ttl: float, prefix: str = 'intent:'):
+        self.redis_url = redis_url
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = get_redis(self.redis_url).get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: Any):
+        get_redis(self.redis_url).setex(self.prefix + key, self.ttl, json.dumps(value))
+
+class IntentCache:
+    """Two-level cache of parsed intents in front of the LLM call.
+
+    Level one is an exact match on (user, normalized text). Level two
+    stores the intent with user-specific slots templated out, so a phrasing
+    seen from one user answers the same phrasing from another. Level two
+    lives in-process or, when configured, in Redis. Results whose values
+    can't be mapped back to slots unambiguously are only cached at level
+    one.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600, backend: str = 'memory',
+                 redis_url: Optional[str] = None):
+        self.exact = LRUCache(max_entries, ttl)
+        if backend == 'redis' and redis_url:
+            self.templates = RedisTemplateStore(redis_url, ttl)
+        else:
+            self.templates = LRUCache(max_entries, ttl)
+        self.hits_exact = 0
+        self.hits_template = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, user_input: str, user_name: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached intent, or None on a miss"""
+        exact_key = f"{user_name.lower()}\x00{normalize(user_input)}"
+        value = self.exact.get(exact_key)
+        if value is not None:
+            self.hits_exact += 1
+            return dict(value)
+
+        template, slots = templatize(user_input, user_name)
+        try:
+            templated = self.templates.get(template)
+        except Exception:
+            # A cache outage must never fail the chat request
+            self.errors += 1
+            templated = None
+        if templated is not None:
+            value = self._fill(templated, slots, user_name)
+            if value is not None:
+                self.hits_template += 1
+                self.exact.set(exact_key, value)
+                return dict(value)
+
+        self.misses += 1
+        return None
+
+    def put(self, user_input: str, user_name: str, value: Dict[str, Any]):
+        """Cache a parsed intent at both levels where possible"""
+        if value.get('intent') == 'ERROR':
+            return
+        self.exact.set(f"{user_name.lower()}\x00{normalize(user_input)}", dict(value))
+
+        template, slots = templatize(user_input, user_name)
+        templated = self._extract(value, slots, user_name)
+        if templated is None:
+            return
+        try:
+            self.templates.set(template, templated)
+        except Exception:
+            self.errors += 1
+
+    @staticmethod
+    def _extract(value: Dict[str, Any], slots: List[str], user_name: str) -> Optional[Dict[str, Any]]:
+        """Swap slot values in a parsed intent for their placeholders"""
+        templated = {}
+        for field, item in value.items():
+            if field in ('account_number', 'amount') and item is not None:
+                matches = {i for i, slot in enumerate(slots) if _same_value(slot, item)}
+                if len(matches) > 1:
+                    return None
+                if matches:
+                    item = {'slot': matches.pop(), 'type': type(item).__name__}
+                elif slots:
+                    # A number that did not come from the query can't generalize
+                    return None
+            else:
+                if _mentions_slot(item, slots):
+                    # e.g. a reply echoing "$500 to account 7": stored
+                    # verbatim it would answer another user's numbers
+                    return None
+                if isinstance(item, str) and user_name and name_pattern(user_name).search(item):
+                    item = {'text': name_pattern(user_name).sub('{user}', item)}
+            templated[field] = item
+        return templated
+
+    @staticmethod
+    def _fill(templated: Dict[str, Any], slots: List[str], user_name: str) -> Optional[Dict[str, Any]]:
+        """Put this query's slot values back into a templated intent"""
+        value = {}
+        for field, item in templated.items():
+            if isinstance(item, dict) and 'slot' in item:
+                if item['slot'] >= len(slots):
+                    return None
+                slot = slots[item['slot']]
+                item = float(slot) if item['type'] == 'float' else slot
+            elif isinstance(item, dict) and 'text' in item:
+                item = item['text'].replace('{user}', user_name)
+            value[field] = item
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits_exact': self.hits_exact,
+            'hits_template': self.hits_template,
+            'misses': self.misses,
+            'errors': self.errors
+        }
+
+def _same_value(slot: str, item: Any) -> bool:
+    try:
+        return float(slot) == float(item)
+    except (TypeError, ValueError):
+        return False
+
+def _mentions_slot(item: Any, slots: List[str]) -> bool:
+    """True if a field outside the slots carries one of the query's numbers"""
+    if isinstance(item, str):
+        numbers = [match.lstrip('$').replace(',', '') for match in NUMBER_PATTERN.findall(item)]
+    elif isinstance(item, (int, float)) and not isinstance(item, bool):
+        numbers = [item]
+    else:
+        return False
+    return any(_same_value(slot, number) for slot in slots for number in numbers)
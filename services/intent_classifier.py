@@ -0,0 +1,108 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+ACCOUNT_MARKER = r'(?:account|acc|a/c)\s*(?:no\.?|number|#)?\s*'
+ACCOUNT = rf'(?:{ACCOUNT_MARKER})?(\d+)'
+# Account-first transfers must say which number is the account: "send 500 7"
+# could be either way round
+MARKED_ACCOUNT = rf'(?:to\s+(?:{ACCOUNT_MARKER})?|{ACCOUNT_MARKER})(\d+)'
+AMOUNT = r'(?:\$|rs\.?\s*|inr\s*)?(\d[\d,]*(?:\.\d+)?)\s*(?:dollars?|usd|rupees?|rs)?'
+
+TRANSFER_WORDS = re.compile(r'\b(?:transfer|send|pay|move|wire)\b')
+BALANCE_WORDS = re.compile(r'\b(?:balance|how much (?:money )?(?:do i have|is (?:in|on) my account))\b')
+# "don't send 5 to 7" and "is there a fee to send 5 to 7" are not requests
+# to act; balance lookups are phrased as questions, so only those may be
+NEGATION_WORDS = re.compile(r"\b(?:not|never|cancel|stop)\b|n't\b|\bdont\b")
+QUESTION_START = re.compile(r'^(?:is|are|how|what|why|when|where|can|could|should|do|does|will|would)\b')
+
+class RuleClassifier:
+    """Deterministic pre-classifier for the common, unambiguous phrasings.
+
+    Each rule yields a line in the same TRANSFER|BALANCE|INFO|CHAT grammar
+    the LLM is asked to produce, plus a confidence. Queries that match
+    rules of different intents are treated as ambiguous and left to the LLM,
+    as are negated queries and questions about transfers or account info.
+    """
+
+    RULES: List[Tuple[str, re.Pattern, float]] = [
+        ('TRANSFER', re.compile(rf'^(?:please\s+)?(?:transfer|send|pay|move|wire)\s+{AMOUNT}\s+(?:to|into)\s+{ACCOUNT}\s*$'), 0.97),
+        ('TRANSFER', re.compile(rf'^(?:please\s+)?(?:transfer|send|pay|move|wire)\s+{MARKED_ACCOUNT}\s+(?:an amount of\s+)?{AMOUNT}\s*$'), 0.9),
+        ('BALANCE', re.compile(rf'\bbalance\s+(?:of|for|in)\s+{ACCOUNT}\s*$'), 0.95),
+        ('BALANCE', re.compile(r"^(?:what(?:'s| is)\s+)?(?:my\s+)?(?:account\s+)?balance$|^(?:check|show)\s+(?:my\s+)?balance$"), 0.95),
+        ('BALANCE', BALANCE_WORDS, 0.85),
+        ('INFO', re.compile(r'^(?:please\s+)?(?:(?:show|view|see|get|display|give)\s+(?:me\s+)?)?(?:my\s+)?(?:account\s+)?'
+                            r'(?:info|information|details)$|^account$'), 0.92),
+        ('CHAT', re.compile(r'^(?:hi|hello|hey|good (?:morning|afternoon|evening))(?:\s+there)?$'), 0.95),
+        ('CHAT', re.compile(r'^(?:thanks|thank you|thx)(?:\s+so much)?$'), 0.95),
+    ]
+
+    CHAT_REPLIES = {
+        'greeting': "Hello! How can I help with your banking today?",
+        'thanks': "You're welcome! Is there anything else I can help you with?"
+    }
+
+    def __init__(self, threshold: float = 0.9):
+        self.threshold = threshold
+        self.served_locally = 0
+        self.deferred = 0
+        self._lock = threading.Lock()
+
+    def classify(self, user_input: str) -> Tuple[Optional[str], float]:
+        """Return (grammar line, confidence) for the best matching rule"""
+        text = re.sub(r'\s+', ' ', user_input.lower()).strip(' ?!.')
+        if NEGATION_WORDS.search(text):
+            return None, 0.0
+        question = '?' in user_input or QUESTION_START.match(text)
+        best_line, best_confidence = None, 0.0
+        intents = set()
+
+        for intent, pattern, confidence in self.RULES:
+            match = pattern.search(text)
+            if not match:
+                continue
+            intents.add(intent)
+            if confidence > best_confidence:
+                best_line, best_confidence = self._line(intent, pattern, match), confidence
+
+        # Mentions of both moving money and checking it need the LLM
+        if TRANSFER_WORDS.search(text) and BALANCE_WORDS.search(text):
+            intents.update(('TRANSFER', 'BALANCE'))
+        if len(intents) > 1 or (question and intents & {'TRANSFER', 'INFO'}):
+            return None, 0.0
+        return best_line, best_confidence
+
+    def _line(self, intent: str, pattern: re.Pattern, match: re.Match) -> str:
+        groups = match.groups()
+        if intent == 'TRANSFER':
+            # The two transfer rules capture (amount, account) and (account, amount)
+            if pattern is self.RULES[0][1]:
+                amount, account = groups
+            else:
+                account, amount = groups
+            return f"TRANSFER|{account}|{amount}"
+        if intent == 'BALANCE':
+            return f"BALANCE|{groups[0] if groups else ''}"
+        if intent == 'INFO':
+            return "INFO"
+        reply = self.CHAT_REPLIES['thanks'] if match.group().startswith(('thank', 'thx')) else self.CHAT_REPLIES['greeting']
+        return f"CHAT|{reply}"
+
+    def try_classify(self, user_input: str) -> Optional[str]:
+        """Return a grammar line if confident enough, else None for the LLM"""
+        line, confidence = self.classify(user_input)
+        served = line is not None and confidence >= self.threshold
+        with self._lock:
+            if served:
+                self.served_locally += 1
+            else:
+                self.deferred += 1
+        return line if served else None
+
+    def stats(self) -> Dict[str, float]:
+        total = self.served_locally + self.deferred
+        return {
+            'served_locally': self.served_locally,
+            'deferred': self.deferred,
+            'local_fraction': self.served_locally / total if total else 0.0
+        }
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+def epoch_record(snapshot: str) -> Dict[str, Any]:
+    """Marker for the start of the records that apply on top of a users file.
+
+    snapshot is the SHA-256 hex digest of that file's bytes, so touching
+    or copying the file doesn't look like a change.
+    """
+    return {'op': 'epoch', 'snapshot': snapshot}
+
+class TransactionJournal:
+    """Append-only, fsync'd log of account mutations.
+
+    Each record is one compact JSON line. Records carry absolute values
+    (resulting balances, timestamps) rather than deltas, so replaying a
+    record that is already reflected in the snapshot is harmless. Epoch
+    markers tie the records after them to one version of the users file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def signature(self) -> Optional[Tuple[int, int]]:
+        """Return (inode, size) of the journal, or None if it is missing"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def append(self, record: Dict[str, Any]):
+        """Durably append a single record"""
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(fd, line.encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def read_from(self, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Read complete records starting at a byte offset.
+
+        Returns the records and the offset just past the last complete line.
+        A torn trailing line left by a crash mid-append is ignored.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        end = data.rfind(b'\n') + 1
+        records = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records, offset + end
+
+    def epochs(self) -> List[Tuple[str, int]]:
+        """(snapshot digest, offset just past the marker) for every epoch marker, oldest first"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+
+        epochs, position = [], 0
+        for line in data[:data.rfind(b'\n') + 1].splitlines(keepends=True):
+            position += len(line)
+            if b'"op":"epoch"' not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            epochs.append((record.get('snapshot'), position))
+        return epochs
+
+    def insert_epoch(self, offset: int, snapshot: str):
+        """Write an epoch marker for snapshot at a byte offset.
+
+        Records after offset are the ones the snapshot doesn't contain yet,
+        so they end up behind the marker.
+        """
+        line = json.dumps(epoch_record(snapshot), separators=(',', ':')).encode('utf-8') + b'\n'
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = b''
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data[:offset] + line + data[offset:])
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def discard_before(self, offset: int):
+        """Drop records up to offset, keeping anything appended after it"""
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    tail = f.read()
+            except FileNotFoundError:
+                return
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,160 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import httpx
+from openai import AsyncOpenAI
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import metrics
+
+class LLMClient:
+    """Chat completions on a dedicated asyncio loop with a shared HTTP pool.
+
+    Every completion, whether requested from a sync Flask view or from a
+    coroutine, runs on one background event loop. Calls share one pooled
+    httpx connection pool, are capped by a concurrency semaphore, get a hard
+    deadline, and pass through a circuit breaker so a failing upstream is
+    refused quickly instead of holding request threads.
+    """
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str] = None,
+                 timeout: float = 10, max_retries: int = 1,
+                 max_concurrency: int = 64, pool_size: int = 100,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.in_flight = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name='llm-client', daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def _async_client(self) -> AsyncOpenAI:
+        # Built on the loop thread so the connection pool belongs to that loop
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=self.pool_size,
+                                        max_keepalive_connections=self.pool_size),
+                    timeout=self.timeout
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _record(self, completed: bool, cancelled: bool):
+        # Called on every exit after breaker.allow() so a half-open probe
+        # always reports back. Cancellation comes from our caller (a client
+        # that disconnected mid-stream), not the upstream, so it isn't a
+        # failure; the deadline surfaces as TimeoutError and still counts
+        if cancelled:
+            self.breaker.release()
+        elif completed:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    @metrics.timed('llm.completion')
+    async def complete_in_loop(self, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        """Run one completion; must be awaited on the client's own loop"""
+        self.breaker.allow()
+        completed = cancelled = False
+        try:
+            client = self._async_client()
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    completion = await asyncio.wait_for(
+                        client.chat.completions.create(messages=messages, **kwargs),
+                        timeout=self.timeout * (self.max_retries + 1)
+                    )
+                finally:
+                    self.in_flight -= 1
+            content = completion.choices[0].message.content.strip()
+            completed = True
+            return content
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            self._record(completed, cancelled)
+
+    @metrics.timed('llm.stream')
+    async def stream_in_loop(self, messages: List[Dict[str, str]], on_delta: Callable[[str], None],
+                             **kwargs: Any):
+        """Run one streamed completion, passing each text delta to on_delta.
+
+        Must be awaited on the client's own loop. The deadline covers the
+        whole stream, not just its first byte.
+        """
+        self.breaker.allow()
+        completed = cancelled = False
+        try:
+            client = self._async_client()
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    await asyncio.wait_for(self._consume_stream(client, messages, on_delta, kwargs),
+                                           timeout=self.timeout * (self.max_retries + 1))
+                finally:
+                    self.in_flight -= 1
+            completed = True
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            self._record(completed, cancelled)
+
+    @staticmethod
+    async def _consume_stream(client: AsyncOpenAI, messages: List[Dict[str, str]],
+                              on_delta: Callable[[str], None], kwargs: Dict[str, Any]):
+        stream = await client.chat.completions.create(messages=messages, stream=True, **kwargs)
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                on_delta(delta)
+
+    def submit(self, coro) -> Future:
+        """Schedule a coroutine on the client's loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def complete(self, messages: List[Dict[str, str]], **kwargs: Any) -> str:
+        """Blocking completion for sync callers"""
+        return self.submit(self.complete_in_loop(messages, **kwargs)).result()
+
+    def stream(self, messages: List[Dict[str, str]], **kwargs: Any) -> Iterator[str]:
+        """Blocking iterator over a streamed completion's text for sync callers.
+
+        Closing the iterator before the end cancels the request.
+        """
+        deltas: 'queue.Queue[Optional[str]]' = queue.Queue()
+        future = self.submit(self.stream_in_loop(messages, deltas.put, **kwargs))
+        future.add_done_callback(lambda _: deltas.put(None))
+        try:
+            while True:
+                delta = deltas.get()
+                if delta is None:
+                    break
+                yield delta
+            future.result()
+        finally:
+            future.cancel()
@@ -0,0 +1,175 @@
+import bisect
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; spans from sub-millisecond cache hits up to slow LLM round trips
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus expects"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+class MetricsRegistry:
+    """Process-wide timing spans, counters and gauges in Prometheus text format"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, LabelSet], Histogram] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, help_text: str = '', **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+                self._help.setdefault(name, help_text)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block into app_span_duration_seconds{span=name}"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('app_span_duration_seconds', time.perf_counter() - start,
+                         'Time spent in instrumented code paths', span=name)
+
+    def timed(self, name: str):
+        """Decorator form of span() for sync and async functions"""
+        def decorator(f):
+            if inspect.iscoroutinefunction(f):
+                @wraps(f)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await f(*args, **kwargs)
+                return async_wrapper
+
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]):
+        """Add a callback yielding (name, type, labels, value) samples at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        typed = set()
+        with self._lock:
+            series = sorted(self._histograms.items())
+            for (name, labels), histogram in series:
+                if name not in typed:
+                    lines.append(f'# HELP {name} {self._help.get(name, "")}')
+                    lines.append(f'# TYPE {name} histogram')
+                    typed.add(name)
+                cumulative = 0
+                bounds = [repr(float(b)) for b in histogram.buckets] + ['+Inf']
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, le=bound)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {histogram.total}')
+                lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+
+            # Precomputed p50/p95/p99 for dashboards without histogram_quantile
+            for (name, labels), histogram in series:
+                quantile_name = f'{name}_quantile'
+                if quantile_name not in typed:
+                    lines.append(f'# TYPE {quantile_name} gauge')
+                    typed.add(quantile_name)
+                for q in QUANTILES:
+                    lines.append(f'{quantile_name}{_labels(labels, quantile=str(q))} {histogram.quantile(q)}')
+
+        for collector in self._collectors:
+            for name, metric_type, labels, value in collector():
+                if name not in typed:
+                    lines.append(f'# TYPE {name} {metric_type}')
+                    typed.add(name)
+                lines.append(f'{name}{_labels(tuple(sorted(labels.items())))} {value}')
+        return '\n'.join(lines) + '\n'
+
+def _labels(labels: LabelSet, **extra: str) -> str:
+    pairs = list(labels) + sorted(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval into folded stacks.
+
+    The output is the "frame;frame;frame count" format consumed by
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return '\n'.join(f'{stack} {count}' for stack, count in self.samples.most_common()) + '\n'
+
+metrics = MetricsRegistry()
@@ -0,0 +1,138 @@
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+from limits.storage import MovingWindowSupport, Storage
+
+class _Shard:
+    __slots__ = ('lock', 'counters', 'windows', 'writes')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Fixed-window counters as [count, expires_at]
+        self.counters: Dict[str, List[float]] = {}
+        # Moving-window length and hit timestamps, oldest first
+        self.windows: Dict[str, Tuple[int, Deque[float]]] = {}
+        self.writes = 0
+
+class ShardedMemoryStorage(Storage, MovingWindowSupport):
+    """In-process rate-limit storage split across independently locked shards.
+
+    Registered with the limits package as "sharded-memory://". Keys hash
+    onto shards the same way the transfer locks do, so requests from
+    different clients rarely share a lock. Expired entries are dropped as
+    they are touched, and a shard is swept after every SWEEP_EVERY keys
+    created in it, so no background thread walks the whole table.
+    """
+
+    STORAGE_SCHEME = ['sharded-memory']
+    SWEEP_EVERY = 1024
+
+    def __init__(self, uri: str = None, shards: int = 16, **options):
+        self._shards = [_Shard() for _ in range(max(1, int(shards)))]
+        super().__init__(uri, **options)
+
+    @property
+    def base_exceptions(self):
+        return ValueError
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[zlib.crc32(key.encode('utf-8')) % len(self._shards)]
+
+    @staticmethod
+    def _prune(window: Deque[float], cutoff: float):
+        while window and window[0] <= cutoff:
+            window.popleft()
+
+    def _wrote(self, shard: _Shard, now: float):
+        """Count a new key and occasionally drop the shard's dead keys; lock held"""
+        shard.writes += 1
+        if shard.writes % self.SWEEP_EVERY:
+            return
+        for key in [k for k, (_, expires_at) in shard.counters.items() if expires_at <= now]:
+            del shard.counters[key]
+        for key, (expiry, window) in list(shard.windows.items()):
+            self._prune(window, now - expiry)
+            if not window:
+                del shard.windows[key]
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        now = time.time()
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.counters.get(key)
+            if entry is None or entry[1] <= now:
+                entry = shard.counters[key] = [0, now + expiry]
+                self._wrote(shard, now)
+            elif elastic_expiry:
+                entry[1] = now + expiry
+            entry[0] += amount
+            return entry[0]
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.counters.get(key)
+            if entry is None:
+                return 0
+            entry[0] = max(entry[0] - amount, 0)
+            return entry[0]
+
+    def get(self, key: str) -> int:
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.counters.get(key)
+            return entry[0] if entry is not None and entry[1] > time.time() else 0
+
+    def get_expiry(self, key: str) -> float:
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.counters.get(key)
+            return entry[1] if entry is not None else time.time()
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.windows.get(key)
+            if entry is None:
+                entry = shard.windows[key] = (expiry, deque())
+                self._wrote(shard, now)
+            window = entry[1]
+            self._prune(window, now - expiry)
+            if len(window) + amount > limit:
+                return False
+            window.extend([now] * amount)
+            return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> Tuple[float, int]:
+        now = time.time()
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.windows.get(key)
+            if entry is None:
+                return now, 0
+            window = entry[1]
+            self._prune(window, now - expiry)
+            return (window[0], len(window)) if window else (now, 0)
+
+    def check(self) -> bool:
+        return True
+
+    def reset(self) -> int:
+        cleared = 0
+        for shard in self._shards:
+            with shard.lock:
+                cleared += len(shard.counters) + len(shard.windows)
+                shard.counters.clear()
+                shard.windows.clear()
+        return cleared
+
+    def clear(self, key: str):
+        shard = self._shard(key)
+        with shard.lock:
+            shard.counters.pop(key, None)
+            shard.windows.pop(key, None)
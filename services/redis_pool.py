@@ -0,0 +1,27 @@
+import threading
+from typing import Any, Dict
+from config import Config
+
+_clients: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+def get_redis(url: str):
+    """Return the process-wide pooled client for url, created on first use.
+
+    Nothing connects until the first command, so a configured but
+    unreachable Redis never blocks startup; the pool then keeps up to
+    REDIS_MAX_CONNECTIONS sockets open for reuse across requests.
+    """
+    client = _clients.get(url)
+    if client is None:
+        with _lock:
+            client = _clients.get(url)
+            if client is None:
+                import redis
+                client = _clients[url] = redis.Redis.from_url(
+                    url,
+                    max_connections=Config.REDIS_MAX_CONNECTIONS,
+                    socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=Config.REDIS_SOCKET_TIMEOUT
+                )
+    return client
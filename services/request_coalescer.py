@@ -0,0 +1,112 @@
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from services.llm_client import LLMClient
+
+BATCH_INSTRUCTIONS = """
+        You will receive several numbered queries, one per line, each from a different user.
+        Answer every query independently using the formats above.
+        Users are not named; write {user} wherever you would address one by name.
+        Reply with exactly one line per query, starting with its number and ") ",
+        for example: 1) BALANCE|
+        """
+
+NUMBERED_LINE = re.compile(r'^\s*(\d+)\s*[).:-]\s*(.+)$')
+WHITESPACE = re.compile(r'\s+')
+
+class RequestCoalescer:
+    """Classifies concurrent queries in one LLM request.
+
+    Queries arriving within window seconds of each other (or until
+    max_batch have queued) are sent as a single numbered prompt, and the
+    numbered reply lines are fanned back out to the waiting callers. A
+    lone query uses the normal single-query prompt, and any query whose
+    line is missing from a batch reply is retried on its own, so callers
+    wait at most the window plus one or two completions.
+    """
+
+    def __init__(self, llm: LLMClient, system_prompt: str, completion_args: Dict[str, Any],
+                 window: float = 0.05, max_batch: int = 16, max_tokens_cap: int = 4096):
+        self.llm = llm
+        self.system_prompt = system_prompt
+        self.completion_args = completion_args
+        self.window = window
+        self.max_batch = max_batch
+        self.max_tokens_cap = max_tokens_cap
+        self.batches = 0
+        self.batched_queries = 0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def classify(self, user_content: str) -> str:
+        """Return the raw grammar reply for one query; runs on the LLM loop"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((user_content, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        if len(batch) == 1:
+            await self._run_single(*batch[0])
+            return
+
+        self.batches += 1
+        self.batched_queries += len(batch)
+        numbered = '\n'.join(
+            f"{i}) {WHITESPACE.sub(' ', content)}" for i, (content, _) in enumerate(batch, start=1)
+        )
+        args = dict(self.completion_args)
+        args['max_tokens'] = min(self.max_tokens_cap, args.get('max_tokens', 200) * len(batch))
+        try:
+            reply = await self.llm.complete_in_loop([
+                {"role": "system", "content": self.system_prompt + BATCH_INSTRUCTIONS},
+                {"role": "user", "content": numbered}
+            ], **args)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        answers = {}
+        for line in reply.splitlines():
+            match = NUMBERED_LINE.match(line)
+            if match:
+                answers.setdefault(int(match.group(1)), match.group(2).strip())
+
+        retries = []
+        for i, (content, future) in enumerate(batch, start=1):
+            if i in answers:
+                future.set_result(answers[i])
+            else:
+                retries.append(self._run_single(content, future))
+        if retries:
+            await asyncio.gather(*retries)
+
+    async def _run_single(self, user_content: str, future: asyncio.Future):
+        try:
+            reply = await self.llm.complete_in_loop([
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_content}
+            ], **self.completion_args)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(reply)
+
+    def stats(self) -> Dict[str, int]:
+        return {'batches': self.batches, 'batched_queries': self.batched_queries}
@@ -0,0 +1,71 @@
+import json
+import secrets
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from services.redis_pool import get_redis
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid: str = None, new: bool = False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+class RedisSessionInterface(SessionInterface):
+    """Keeps session data in Redis; the cookie only carries a random id.
+
+    Used when SESSION_BACKEND is 'redis', so several app nodes share
+    sessions. If Redis can't be reached the request continues with an
+    empty session, the same as an expired one, rather than failing.
+    """
+
+    def __init__(self, redis_url: str, prefix: str = 'session:'):
+        self.redis_url = redis_url
+        self.prefix = prefix
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            try:
+                raw = get_redis(self.redis_url).get(self.prefix + sid)
+            except Exception:
+                app.logger.warning('Session store unavailable; continuing with an empty session')
+                raw = None
+            if raw:
+                return ServerSession(json.loads(raw), sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                try:
+                    get_redis(self.redis_url).delete(self.prefix + session.sid)
+                except Exception:
+                    app.logger.warning('Session store unavailable; session not deleted')
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+        ttl = int(app.permanent_session_lifetime.total_seconds())
+        try:
+            get_redis(self.redis_url).setex(self.prefix + session.sid, ttl, json.dumps(dict(session)))
+        except Exception:
+            app.logger.warning('Session store unavailable; session not saved')
+            return
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
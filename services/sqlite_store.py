@@ -0,0 +1,295 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+from models.user import User, to_cents
+from services.storage import StorageBackend, plan_transfers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    account_number TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    balance_cents INTEGER NOT NULL,
+    auth_code_hash TEXT NOT NULL DEFAULT '',
+    created_at TEXT,
+    last_login TEXT,
+    is_active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_users_name_lower ON users (name_lower);
+CREATE TABLE IF NOT EXISTS account_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_number TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS users_inserted AFTER INSERT ON users BEGIN
+    INSERT INTO account_changes (account_number) VALUES (NEW.account_number);
+END;
+CREATE TRIGGER IF NOT EXISTS users_updated AFTER UPDATE ON users BEGIN
+    INSERT INTO account_changes (account_number) VALUES (OLD.account_number);
+    INSERT INTO account_changes (account_number)
+        SELECT NEW.account_number WHERE NEW.account_number != OLD.account_number;
+END;
+CREATE TRIGGER IF NOT EXISTS users_deleted AFTER DELETE ON users BEGIN
+    INSERT INTO account_changes (account_number) VALUES (OLD.account_number);
+END;
+"""
+
+# Stay well under SQLite's bound-parameter limit for IN (...) lookups
+IN_CHUNK = 500
+
+COLUMNS = "account_number, name, balance_cents, auth_code_hash, created_at, last_login, is_active"
+
+# account_changes rows kept for other workers to catch up on, and how many
+# local commits pass between trims
+CHANGE_LOG_KEEP = 10000
+CHANGE_LOG_TRIM_EVERY = 1000
+
+class SqliteStore(StorageBackend):
+    """SQLite account storage, safe to share between worker processes.
+
+    Runs in WAL mode so readers never block the writer, and keeps one
+    connection per thread. Balances are stored as integer cents, and a
+    transfer is a single IMMEDIATE transaction whose debit is guarded by
+    ``balance_cents >= ?``, so concurrent workers cannot overdraw or lose
+    updates.
+
+    Triggers log every changed account number to account_changes, whoever
+    made the change. refresh() reads the rows added since it last looked
+    (only when ``PRAGMA data_version`` says another connection committed)
+    and reports them to watchers; local writes report their own accounts
+    right after committing.
+    """
+
+    def __init__(self, path: str, seed_file: Optional[str] = None):
+        self.path = path
+        self._local = threading.local()
+        self._watchers: List[Callable[[Optional[Iterable[str]]], None]] = []
+        self._changes_lock = threading.Lock()
+        self._commits = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        if seed_file:
+            self._seed_from_json(seed_file)
+        self._seen_change = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM account_changes').fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def _seed_from_json(self, seed_file: str):
+        """Import users.json into an empty database"""
+        conn = self._connection()
+        if conn.execute('SELECT 1 FROM users LIMIT 1').fetchone():
+            return
+        try:
+            with open(seed_file, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        rows = [self._to_row(User.from_dict(user_data)) for user_data in data]
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR IGNORE INTO users (account_number, name, name_lower, balance_cents, '
+                'auth_code_hash, created_at, last_login, is_active) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _to_row(user: User) -> tuple:
+        record = user.to_dict()
+        return (
+            user.account_number,
+            user.name,
+            user.name.lower(),
+            user.balance_cents,
+            user.auth_code_hash,
+            record['created_at'],
+            record['last_login'],
+            int(bool(user.is_active))
+        )
+
+    @staticmethod
+    def _from_row(row) -> User:
+        return User.from_dict({
+            'account_number': row[0],
+            'name': row[1],
+            'balance': row[2] / 100,
+            'auth_code_hash': row[3],
+            'created_at': row[4],
+            'last_login': row[5],
+            'is_active': bool(row[6])
+        })
+
+    def watch(self, callback: Callable[[Optional[Iterable[str]]], None]) -> bool:
+        self._watchers.append(callback)
+        return True
+
+    def _notify(self, account_numbers: Optional[Iterable[str]]):
+        for callback in self._watchers:
+            callback(account_numbers)
+
+    def refresh(self):
+        """Report accounts other connections have changed since the last look"""
+        if not self._watchers:
+            return
+        conn = self._connection()
+        # data_version only moves when a different connection commits
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == getattr(self._local, 'data_version', None):
+            return
+        self._local.data_version = data_version
+        with self._changes_lock:
+            rows = conn.execute(
+                'SELECT seq, account_number FROM account_changes WHERE seq > ? ORDER BY seq',
+                (self._seen_change,)
+            ).fetchall()
+            if not rows:
+                return
+            # A gap means the rows we hadn't read yet were trimmed
+            missed = rows[0][0] != self._seen_change + 1
+            self._seen_change = rows[-1][0]
+        self._notify(None if missed else {account_number for _, account_number in rows})
+
+    def _committed(self, account_numbers: Iterable[str]):
+        """Report a local write, trimming the change log every so often"""
+        if not self._watchers:
+            return
+        self._notify(account_numbers)
+        with self._changes_lock:
+            self._commits += 1
+            trim = self._commits % CHANGE_LOG_TRIM_EVERY == 0
+        if trim:
+            self._connection().execute(
+                'DELETE FROM account_changes WHERE seq <= (SELECT MAX(seq) FROM account_changes) - ?',
+                (CHANGE_LOG_KEEP,)
+            )
+
+    def users(self) -> List[User]:
+        rows = self._connection().execute(f'SELECT {COLUMNS} FROM users ORDER BY rowid').fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def get_by_account(self, account_number: str) -> Optional[User]:
+        row = self._connection().execute(
+            f'SELECT {COLUMNS} FROM users WHERE account_number = ?', (account_number,)
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def get_by_name(self, name: str) -> Optional[User]:
+        row = self._connection().execute(
+            f'SELECT {COLUMNS} FROM users WHERE name_lower = ? ORDER BY rowid LIMIT 1', (name.lower(),)
+        ).fetchone()
+        return self._from_row(row) if row else None
+
+    def record_login(self, account_number: str, when: datetime):
+        self._connection().execute(
+            'UPDATE users SET last_login = ? WHERE account_number = ?',
+            (when.isoformat(), account_number)
+        )
+        self._committed((account_number,))
+
+    def update_user(self, updated_user: User) -> bool:
+        row = self._to_row(updated_user)
+        cursor = self._connection().execute(
+            'UPDATE users SET name = ?, name_lower = ?, balance_cents = ?, auth_code_hash = ?, '
+            'created_at = ?, last_login = ?, is_active = ? WHERE account_number = ?',
+            row[1:] + (row[0],)
+        )
+        if cursor.rowcount == 0:
+            return False
+        self._committed((updated_user.account_number,))
+        return True
+
+    def transfer(self, from_account: str, to_account: str, amount: float) -> Tuple[bool, str]:
+        conn = self._connection()
+        cents = to_cents(amount)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            source = conn.execute(
+                'SELECT balance_cents FROM users WHERE account_number = ?', (from_account,)
+            ).fetchone()
+            destination = None
+            if to_account != from_account:
+                destination = conn.execute(
+                    'SELECT 1 FROM users WHERE account_number = ?', (to_account,)
+                ).fetchone()
+
+            error = None
+            if not source:
+                error = "Source account not found"
+            elif not destination:
+                error = "Destination account not found"
+            elif source[0] < cents:
+                error = "Insufficient funds"
+            elif cents <= 0:
+                error = "Invalid amount"
+            if error:
+                conn.execute('ROLLBACK')
+                return False, error
+
+            debited = conn.execute(
+                'UPDATE users SET balance_cents = balance_cents - ? '
+                'WHERE account_number = ? AND balance_cents >= ?',
+                (cents, from_account, cents)
+            ).rowcount
+            if debited != 1:
+                conn.execute('ROLLBACK')
+                return False, "Insufficient funds"
+            conn.execute(
+                'UPDATE users SET balance_cents = balance_cents + ? WHERE account_number = ?',
+                (cents, to_account)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._committed((from_account, to_account))
+        return True, "Transfer successful"
+
+    def transfer_many(self, legs: Sequence[Tuple[str, str, float]], atomic: bool = True) -> List[Tuple[bool, str]]:
+        conn = self._connection()
+        cent_legs = [(from_account, to_account, to_cents(amount)) for from_account, to_account, amount in legs]
+        accounts = sorted({account for leg in cent_legs for account in leg[:2]})
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            balances = {}
+            for i in range(0, len(accounts), IN_CHUNK):
+                chunk = accounts[i:i + IN_CHUNK]
+                placeholders = ', '.join('?' * len(chunk))
+                balances.update(conn.execute(
+                    f'SELECT account_number, balance_cents FROM users WHERE account_number IN ({placeholders})',
+                    chunk
+                ).fetchall())
+
+            results, changed = plan_transfers(balances, cent_legs, atomic)
+            conn.executemany(
+                'UPDATE users SET balance_cents = ? WHERE account_number = ?',
+                [(balance, account_number) for account_number, balance in changed.items()]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if changed:
+            self._committed(changed)
+        return results
+
+    def export(self):
+        """Checkpoint the WAL into the main database file"""
+        self._connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
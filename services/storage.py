@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from models.user import User
+
+class StorageBackend:
+    """Interface DatabaseService uses to reach persistent account storage"""
+
+    def users(self) -> List[User]:
+        """Return all users"""
+        raise NotImplementedError
+
+    def get_by_account(self, account_number: str) -> Optional[User]:
+        """Look up a user by account number"""
+        raise NotImplementedError
+
+    def get_by_name(self, name: str) -> Optional[User]:
+        """Look up a user by case-insensitive name"""
+        raise NotImplementedError
+
+    def record_login(self, account_number: str, when: datetime):
+        """Persist a successful login"""
+        raise NotImplementedError
+
+    def update_user(self, updated_user: User) -> bool:
+        """Persist every field of an existing user"""
+        raise NotImplementedError
+
+    def transfer(self, from_account: str, to_account: str, amount: float) -> Tuple[bool, str]:
+        """Atomically move money between two accounts"""
+        raise NotImplementedError
+
+    def transfer_many(self, legs: Sequence[Tuple[str, str, float]], atomic: bool = True) -> List[Tuple[bool, str]]:
+        """Apply a batch of (from, to, amount) transfers and persist once"""
+        raise NotImplementedError
+
+    def export(self):
+        """Flush the current state to its canonical on-disk form"""
+        raise NotImplementedError
+
+    def refresh(self):
+        """Pick up changes other processes have made, if the backend caches any"""
+
+    def watch(self, callback: Callable[[Optional[Iterable[str]]], None]) -> bool:
+        """Report every change to callback as the changed account numbers.
+
+        callback(None) means any account may have changed. Changes made by
+        other processes must be reported by the time refresh() returns.
+        Returns False if the backend can't promise that.
+        """
+        return False
+
+def plan_transfers(balances: Dict[str, int], legs: Sequence[Tuple[str, str, int]],
+                   atomic: bool) -> Tuple[List[Tuple[bool, str]], Dict[str, int]]:
+    """Validate a batch of transfers against one snapshot of balances.
+
+    Balances and leg amounts are integer cents. Legs are checked in order
+    against a working copy, so a later leg sees the debits of earlier ones. Returns a status per leg and the resulting
+    balances of every touched account. When atomic, a single failing leg
+    rejects the whole batch and no balances change.
+    """
+    working = dict(balances)
+    results = []
+    for from_account, to_account, amount in legs:
+        if from_account not in working:
+            results.append((False, "Source account not found"))
+        elif to_account not in working or to_account == from_account:
+            results.append((False, "Destination account not found"))
+        elif working[from_account] < amount:
+            results.append((False, "Insufficient funds"))
+        elif amount <= 0:
+            results.append((False, "Invalid amount"))
+        else:
+            working[from_account] -= amount
+            working[to_account] += amount
+            results.append((True, "Transfer successful"))
+
+    if atomic and not all(ok for ok, _ in results):
+        results = [(False, message if not ok else "Batch rejected") for ok, message in results]
+        return results, {}
+
+    changed = {}
+    for account_number, balance in working.items():
+        if balance != balances[account_number]:
+            changed[account_number] = balance
+    return results, changed
+
+def create_backend(database_url: Optional[str], json_file: str) -> StorageBackend:
+    """Pick a storage backend from a DATABASE_URL.
+
+    sqlite:///relative.db and sqlite:////absolute.db select SQLite (seeded
+    from the JSON file the first time); anything else, including an empty
+    URL, falls back to the JSON file store.
+    """
+    if database_url and database_url.startswith('sqlite:///'):
+        from services.sqlite_store import SqliteStore
+        return SqliteStore(database_url[len('sqlite:///'):], seed_file=json_file)
+
+    from services.account_store import AccountStore
+    from config import Config
+    return AccountStore(json_file, snapshot_every=Config.JOURNAL_SNAPSHOT_INTERVAL)
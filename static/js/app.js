@@ -110,7 +110,7 @@ class BankingChatbot {
         this.showTypingIndicator();
 
         try {
-            const response = await fetch('/api/chat', {
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -119,32 +119,89 @@ class BankingChatbot {
                 body: JSON.stringify({ message: message })
             });
 
-            const data = await response.json();
+            if (!response.ok || !response.body) {
+                const data = await response.json();
+                this.hideTypingIndicator();
+                this.addMessage(data.error || 'Failed to process message', 'bot', 'error');
+                return;
+            }
+
+            await this.readChatStream(response.body);
+        } catch (error) {
             this.hideTypingIndicator();
+            this.addMessage('Sorry, I encountered an error. Please try again.', 'bot', 'error');
+        }
+    }
 
-            if (data.error) {
-                this.addMessage(data.error, 'bot', 'error');
-                return;
+    async readChatStream(body) {
+        // Parse Server-Sent Events from the fetch body: intent, token..., done
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let streamedText = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let payload = '';
+                for (const line of frame.split('\n')) {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) payload += line.slice(6);
+                }
+                const data = payload ? JSON.parse(payload) : {};
+
+                if (event === 'intent' && data.intent === 'CHITCHAT') {
+                    this.hideTypingIndicator();
+                    streamedText = this.addMessage('', 'bot');
+                } else if (event === 'token' && streamedText) {
+                    streamedText.textContent += data.text;
+                    const messagesContainer = document.getElementById('chatMessages');
+                    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+                } else if (event === 'done') {
+                    this.hideTypingIndicator();
+                    this.handleChatResponse(data, streamedText);
+                } else if (event === 'error') {
+                    this.hideTypingIndicator();
+                    this.addMessage(data.error, 'bot', 'error');
+                }
             }
+        }
+    }
+
+    handleChatResponse(data, streamedText = null) {
+        if (data.error) {
+            if (streamedText) streamedText.closest('.message').remove();
+            this.addMessage(data.error, 'bot', 'error');
+            return;
+        }
 
-            // Handle different response types
-            if (data.requires_confirmation && data.intent === 'TRANSFER_MONEY') {
-                this.pendingTransfer = data.transfer_data;
-                this.showTransferModal(data.transfer_data);
-                this.addMessage('Please confirm the transfer details in the modal.', 'bot');
+        // Handle different response types
+        if (data.requires_confirmation && data.intent === 'TRANSFER_MONEY') {
+            this.pendingTransfer = data.transfer_data;
+            this.showTransferModal(data.transfer_data);
+            this.addMessage('Please confirm the transfer details in the modal.', 'bot');
+        } else {
+            if (streamedText) {
+                // Keep the streamed bubble, but settle on the final text
+                streamedText.textContent = data.message;
             } else {
                 this.addMessage(data.message, 'bot');
-                
-                // Update balance if it changed
-                if (data.new_balance !== undefined) {
-                    this.currentUser.balance = data.new_balance;
-                    document.getElementById('userBalance').textContent = data.new_balance.toFixed(2);
-                    sessionStorage.setItem('userInfo', JSON.stringify(this.currentUser));
-                }
             }
-        } catch (error) {
-            this.hideTypingIndicator();
-            this.addMessage('Sorry, I encountered an error. Please try again.', 'bot', 'error');
+            
+            // Update balance if it changed
+            if (data.new_balance !== undefined) {
+                this.currentUser.balance = data.new_balance;
+                document.getElementById('userBalance').textContent = data.new_balance.toFixed(2);
+                sessionStorage.setItem('userInfo', JSON.stringify(this.currentUser));
+            }
         }
     }
 
@@ -169,6 +226,7 @@ class BankingChatbot {
 
         messagesContainer.appendChild(messageDiv);
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        return messageDiv.querySelector('p');
     }
 
     showTypingIndicator() {
@@ -0,0 +1,76 @@
+import json
+import os
+from services.account_store import AccountStore
+
+def write_users(path, balances):
+    with open(path, 'w') as f:
+        json.dump([{'name': f'User{account}', 'account_number': account, 'balance': balance,
+                    'auth_code_hash': '', 'is_active': True}
+                   for account, balance in balances.items()], f, indent=2)
+
+def edit_balance(path, account_number, balance):
+    with open(path) as f:
+        data = json.load(f)
+    for record in data:
+        if record['account_number'] == account_number:
+            record['balance'] = balance
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    # Make sure the edit is seen even on coarse mtime filesystems
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+
+def balances(store):
+    return {user.account_number: user.balance for user in store.users()}
+
+def test_touching_the_file_keeps_journaled_transfers(tmp_path):
+    db = str(tmp_path / 'users.json')
+    write_users(db, {'0': 1000.0, '1': 1000.0})
+    store = AccountStore(db)
+    assert store.transfer('0', '1', 250) == (True, "Transfer successful")
+
+    os.utime(db, ns=(os.stat(db).st_atime_ns, os.stat(db).st_mtime_ns + 10**9))
+
+    assert balances(store) == {'0': 750.0, '1': 1250.0}
+    assert balances(AccountStore(db)) == {'0': 750.0, '1': 1250.0}
+
+def test_edit_to_other_accounts_is_adopted_with_the_journal(tmp_path):
+    db = str(tmp_path / 'users.json')
+    write_users(db, {'0': 1000.0, '1': 1000.0, '2': 1000.0})
+    store = AccountStore(db)
+    store.transfer('0', '1', 250)
+
+    edit_balance(db, '2', 5000.0)
+
+    expected = {'0': 750.0, '1': 1250.0, '2': 5000.0}
+    assert balances(store) == expected
+    assert balances(AccountStore(db)) == expected
+    store.snapshot()
+    assert balances(AccountStore(db)) == expected
+
+def test_edit_conflicting_with_the_journal_is_rejected(tmp_path):
+    db = str(tmp_path / 'users.json')
+    write_users(db, {'0': 1000.0, '1': 1000.0})
+    store = AccountStore(db)
+    store.transfer('0', '1', 250)
+
+    edit_balance(db, '0', 5000.0)
+
+    assert balances(store) == {'0': 750.0, '1': 1250.0}
+    assert balances(AccountStore(db)) == {'0': 750.0, '1': 1250.0}
+    # Once the journal is snapshotted, a fresh edit applies
+    store.snapshot()
+    edit_balance(db, '0', 5000.0)
+    assert balances(store) == {'0': 5000.0, '1': 1250.0}
+
+def test_unparseable_file_keeps_the_last_good_state(tmp_path):
+    db = str(tmp_path / 'users.json')
+    write_users(db, {'0': 1000.0, '1': 1000.0})
+    store = AccountStore(db)
+    store.transfer('0', '1', 250)
+
+    with open(db, 'w') as f:
+        f.write('[{"name": "Us')
+    assert balances(store) == {'0': 750.0, '1': 1250.0}
+    store.snapshot()
+    with open(db) as f:
+        assert f.read() == '[{"name": "Us'
@@ -0,0 +1,37 @@
+import time
+import pytest
+from services.circuit_breaker import CircuitBreaker, CircuitOpen
+
+def test_probe_that_never_reports_back_expires():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    with pytest.raises(CircuitOpen):
+        breaker.allow()
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_released_probe_neither_fails_nor_blocks_the_next():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.allow()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_release_when_closed_counts_nothing():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    for _ in range(3):
+        breaker.allow()
+        breaker.release()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
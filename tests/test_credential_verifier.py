@@ -0,0 +1,21 @@
+import os
+import signal
+import bcrypt
+from services.credential_verifier import CredentialVerifier
+
+HASH = bcrypt.hashpw(b'1234', bcrypt.gensalt(rounds=4)).decode('utf-8')
+
+def test_checks_codes_in_worker_processes():
+    verifier = CredentialVerifier(workers=1, ttl=0)
+    assert verifier.verify('7', '1234', HASH)
+    assert not verifier.verify('7', '0000', HASH)
+
+def test_pool_is_rebuilt_after_a_worker_dies():
+    verifier = CredentialVerifier(workers=1, ttl=0)
+    assert verifier.verify('7', '1234', HASH)
+    broken = verifier._pool
+    for pid in list(broken._processes):
+        os.kill(pid, signal.SIGKILL)
+
+    assert verifier.verify('7', '1234', HASH)
+    assert verifier._pool is not broken
@@ -0,0 +1,39 @@
+from services.chatbot_service import ChatbotService
+from services.intent_cache import IntentCache
+
+parse = ChatbotService()._parse_response
+
+def test_transfer_template_answers_another_user():
+    cache = IntentCache()
+    cache.put("send 500 to account 7", "Alice", parse("TRANSFER|7|500"))
+
+    assert cache.get("send 900 to account 3", "Bob") == parse("TRANSFER|3|900")
+
+def test_reply_echoing_query_numbers_is_not_shared():
+    cache = IntentCache()
+    value = parse("CHAT|I can't help with sending $500 to account 7 right now.")
+    cache.put("send 500 to account 7", "Alice", value)
+
+    assert cache.get("send 900 to account 3", "Bob") is None
+    # Alice's own exact repeat is still cached
+    assert cache.get("send 500 to account 7", "Alice") == value
+
+def test_user_name_is_templated_in_replies():
+    cache = IntentCache()
+    cache.put("hello", "Alice", parse("CHAT|Hi Alice!"))
+
+    assert cache.get("hello", "Bob") == parse("CHAT|Hi Bob!")
+
+def test_name_inside_other_words_is_left_alone():
+    cache = IntentCache()
+    cache.put("thanks al", "Al", parse("CHAT|Always glad to help, Al!"))
+
+    assert cache.get("thanks bob", "Bob") == parse("CHAT|Always glad to help, Bob!")
+
+def test_name_inside_query_words_is_left_alone():
+    cache = IntentCache()
+    cache.put("what is my balance", "Al", parse("BALANCE|"))
+
+    # Not "what is my b{user}ance", which no other user's query would match
+    assert cache.get("what is my balance", "Bob") == parse("BALANCE|")
+    assert cache.stats()['hits_template'] == 1
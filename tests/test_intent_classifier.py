@@ -0,0 +1,33 @@
+import pytest
+from services.intent_classifier import RuleClassifier
+
+@pytest.mark.parametrize('query, line', [
+    ("transfer 500 to 7", "TRANSFER|7|500"),
+    ("Please send $25 to account 12", "TRANSFER|12|25"),
+    ("pay account no 9 an amount of 40", "TRANSFER|9|40"),
+    ("send to 7 500", "TRANSFER|7|500"),
+    ("what's my balance?", "BALANCE|"),
+    ("show my account details", "INFO"),
+    ("account", "INFO"),
+])
+def test_served_locally(query, line):
+    assert RuleClassifier().try_classify(query) == line
+
+@pytest.mark.parametrize('query', [
+    "don't transfer 500 to 7",
+    "do not send 100 to 9",
+    "never send 100 to 9",
+    "cancel transfer 100 to 9",
+    "Is there a fee to transfer 100 to 7",
+    "can I send 100 to 7?",
+    "send 100 to 7?",
+    "I think I should send 100 to 7",
+    "How do I update my account details?",
+    "I want to update my account details",
+    "don't show my balance",
+    "send 500 7",
+    "pay 100 200",
+    "transfer 20 5",
+])
+def test_deferred_to_llm(query):
+    assert RuleClassifier().try_classify(query) is None
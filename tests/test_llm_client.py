@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from services.circuit_breaker import CircuitBreaker
+from services.llm_client import LLMClient
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+class StallingCompletions:
+    """Upstream that sends one delta and then stalls"""
+    async def create(self, messages, stream=False, **kwargs):
+        return self._deltas()
+
+    async def _deltas(self):
+        yield chunk('Hello')
+        await asyncio.sleep(3600)
+
+def make_client(timeout):
+    client = LLMClient('test', timeout=timeout, max_retries=0,
+                       breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30))
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=StallingCompletions()))
+    client._semaphore = asyncio.Semaphore(4)
+    return client
+
+def test_client_disconnect_does_not_trip_the_breaker():
+    client = make_client(timeout=10)
+
+    async def disconnect():
+        received = asyncio.Event()
+        task = asyncio.create_task(client.stream_in_loop([], lambda _: received.set()))
+        await received.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    for _ in range(2):
+        asyncio.run(disconnect())
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.breaker.failures == 0
+
+def test_stream_deadline_counts_as_failure():
+    client = make_client(timeout=0.01)
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(client.stream_in_loop([], lambda _: None))
+    assert client.breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,27 @@
+import asyncio
+from services.chatbot_service import ChatbotService
+from services.request_coalescer import RequestCoalescer
+
+class RecordingLLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def complete_in_loop(self, messages, **kwargs):
+        self.prompts.append(messages)
+        return self.reply
+
+def test_batched_prompt_leaves_names_out():
+    llm = RecordingLLM("1) CHAT|Hi {user}!\n2) CHAT|Goodbye, {user}.")
+    service = ChatbotService()
+    service.coalescer = RequestCoalescer(llm, service.system_prompt, service.COMPLETION_ARGS, window=0.01)
+
+    async def ask_both():
+        return await asyncio.gather(service._completion("hi, this is alice", "Alice"),
+                                    service._completion("bye", "Bob"))
+
+    assert asyncio.run(ask_both()) == ["CHAT|Hi Alice!", "CHAT|Goodbye, Bob."]
+    [prompt] = llm.prompts
+    batch = prompt[-1]['content']
+    assert 'alice' not in batch.lower() and 'bob' not in batch.lower()
+    assert batch == "1) Query: hi, this is {user}\n2) Query: bye"
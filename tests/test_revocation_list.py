@@ -0,0 +1,52 @@
+import time
+import pytest
+from benchmarks.fakes import FakeRedis
+from services import auth_service
+from services.auth_service import RevocationList
+
+class CountingRedis(FakeRedis):
+    def __init__(self):
+        super().__init__()
+        self.polls = 0
+        self.down = False
+
+    def zremrangebyscore(self, key, low, high):
+        if self.down:
+            raise ConnectionError('redis down')
+        return super().zremrangebyscore(key, low, high)
+
+    def zrange(self, key, start, end, withscores=False):
+        self.polls += 1
+        return super().zrange(key, start, end, withscores)
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = CountingRedis()
+    monkeypatch.setattr(auth_service, 'get_redis', lambda url: client)
+    return client
+
+def test_lookups_are_served_from_the_mirror(redis):
+    worker = RevocationList('redis://test', poll_interval=60)
+    for _ in range(1000):
+        assert 'jti-1' not in worker
+    assert redis.polls == 1
+
+def test_revocation_reaches_other_workers_after_a_poll(redis):
+    a = RevocationList('redis://test', poll_interval=0.05)
+    b = RevocationList('redis://test', poll_interval=0.05)
+    assert 'jti-1' not in b
+    a.revoke('jti-1', time.time() + 60)
+    assert 'jti-1' in a
+    time.sleep(0.06)
+    assert 'jti-1' in b
+
+def test_polls_back_off_while_redis_is_down(redis):
+    worker = RevocationList('redis://test', poll_interval=0.05)
+    worker.revoke('local', time.time() + 60)
+    redis.down = True
+    start = time.monotonic()
+    while time.monotonic() - start < 0.3:
+        assert 'local' in worker
+        assert 'other' not in worker
+    # Retried after 0.1s, then 0.2s, rather than on every lookup
+    assert 2 <= worker.errors <= 3